@@ -1,24 +1,98 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Header, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Any
-import uuid
-
-from services.menu_service import get_menu, get_item_by_id
-from classifier.intent_minilm import predict_intent
-from ner.ner_service import nlp_ner, menu_items
-from ner.postprocess import postprocess_ner, score_ner
-from llm.ollama_router import run_llm_response
-from services.cart_llm_executer import apply_llm_cart_decision
+from typing import List
+import asyncio
+import hmac
+import json
+import os
+
+from services.menu_service import get_menu, get_item_by_id, catalog
+from services.order_log import order_log, order_history, item_sales
+from services.kitchen import KitchenConsumer
+from services.idempotency import idempotent_requests, idempotency_stats
+from services.menu_reload import reload_menu, start_menu_reload, stop_menu_reload
+from services.near_cache import near_cache, start_near_cache, stop_near_cache
+from services.order_events import (
+    watch_order,
+    unwatch_order,
+    start_order_events,
+    stop_order_events,
+    order_events_stats,
+)
+# loads the NER model and registers its menu listener (prebuilds matchers)
+import ner.ner_service  # noqa: F401
+from services.cart_service import (
+    MAX_QTY,
+    CART_OPS,
+    MAX_CART_OPS,
+    get_session_and_cart_async,
+    apply_cart_deltas_async,
+    apply_cart_ops_async,
+)
+from services.session_service import (
+    start_session_async,
+    confirm_cart_async,
+    place_order_async,
+    get_order_async,
+    set_order_status_async,
+    order_view,
+    ORDER_TRANSITIONS,
+)
 
 # 🔴 NEW: Redis helpers
-from services.redis_store import set_json, get_json, delete
-from services.cart_llm_executer import apply_llm_cart_decision
+from services.redis_store import (
+    start_round_trip_count,
+    record_round_trips,
+    round_trip_stats,
+)
+from services.chat_pipeline import run_chat_turn, stream_chat_turn, path_stats
+from llm.response_cache import cache_stats
+from llm.semantic_cache import semantic_cache
+from classifier.intent_batcher import intent_batcher
+from classifier.intent_cascade import cascade_stats
+from classifier.intent_minilm import embedding_cache
 
 
 app = FastAPI(title="Restaurant POS Main App")
 
 NER_ACTIONS = {"ADD_ITEM", "REMOVE_ITEM"}
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+ORDER_STREAM_KEEPALIVE = float(os.getenv("ORDER_STREAM_KEEPALIVE", "15"))
+
+
+@app.on_event("startup")
+async def on_startup():
+    start_menu_reload()
+    start_near_cache()
+    start_order_events()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_menu_reload()
+    await stop_near_cache()
+    await stop_order_events()
+    await asyncio.to_thread(order_log.close)
+
+
+# registered first so it runs inside the round-trip counter
+app.middleware("http")(idempotent_requests)
+
+
+@app.middleware("http")
+async def count_redis_round_trips(request: Request, call_next):
+    """
+    X-Redis-Round-Trips on every response (for streams: until the
+    headers go out) plus per-route totals in /agent/stats.
+    """
+    counter = start_round_trip_count()
+    response = await call_next(request)
+
+    route = request.scope.get("route")
+    record_round_trips(getattr(route, "path", request.url.path), counter[0])
+    response.headers["X-Redis-Round-Trips"] = str(counter[0])
+    return response
 
 # -------------------------------
 # Schemas
@@ -38,6 +112,17 @@ class RemoveItemRequest(BaseModel):
     item_id: str
 
 
+class CartOp(BaseModel):
+    op: str
+    item_id: str
+    quantity: int = 1
+
+
+class CartBatchRequest(BaseModel):
+    session_id: str
+    ops: List[CartOp]
+
+
 class ChatRequest(BaseModel):
     message: str
 
@@ -47,6 +132,10 @@ class AgentChatRequest(BaseModel):
     message: str
 
 
+class OrderStatusRequest(BaseModel):
+    status: str
+
+
 # -----------------------
 # Serve UI
 # -----------------------
@@ -60,16 +149,9 @@ def serve_ui():
 # Session APIs
 # -------------------------------
 @app.post("/session/start")
-def start_session(req: StartSessionRequest):
-    session_id = str(uuid.uuid4())
-
-    set_json(
-        f"session:{session_id}",
-        {"table_id": req.table_id, "status": "ORDERING"},
-        ttl=3600,
-    )
-
-    set_json(f"cart:{session_id}", [], ttl=3600)
+async def start_session(req: StartSessionRequest):
+    # the cart hash appears with the first item
+    session_id = await start_session_async(req.table_id)
 
     return {
         "session_id": session_id,
@@ -85,85 +167,120 @@ def get_menu_api():
     return get_menu()
 
 
+def require_admin(x_admin_token: str | None):
+    # fail closed: without ADMIN_TOKEN the admin and kitchen endpoints are off
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints disabled: ADMIN_TOKEN is not set")
+    if not x_admin_token or not hmac.compare_digest(
+        x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.post("/admin/menu/reload")
+async def admin_reload_menu(x_admin_token: str | None = Header(default=None)):
+    require_admin(x_admin_token)
+    return await reload_menu(force=True)
+
+
 # -------------------------------
 # Cart APIs
 # -------------------------------
-@app.post("/cart/add")
-def add_to_cart(req: AddItemRequest):
-    session = get_json(f"session:{req.session_id}")
-    if not session:
+def raise_for_cart_status(status: str):
+    if status == "NO_SESSION":
         raise HTTPException(status_code=404, detail="Invalid session")
-
-    if session["status"] != "ORDERING":
+    if status == "NOT_ORDERING":
         raise HTTPException(status_code=400, detail="Cart already confirmed")
 
+
+@app.post("/cart/add")
+async def add_to_cart(req: AddItemRequest):
     item = get_item_by_id(req.item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    cart = get_json(f"cart:{req.session_id}") or []
-
-    for cart_item in cart:
-        if cart_item["item_id"] == item["id"]:
-            cart_item["quantity"] += req.quantity
-            break
-    else:
-        cart.append({
-            "item_id": item["id"],
-            "name": item["name"],
-            "price": item["price"],
-            "quantity": req.quantity,
-        })
-
-    set_json(f"cart:{req.session_id}", cart, ttl=3600)
+    qty = max(1, min(req.quantity, MAX_QTY))
+    status, cart, _ = await apply_cart_deltas_async(req.session_id, {item["id"]: qty})
+    raise_for_cart_status(status)
 
     return {"message": "Item added to cart", "items": cart}
 
 
 @app.post("/cart/remove")
-def remove_from_cart(req: RemoveItemRequest):
-    session = get_json(f"session:{req.session_id}")
-    if not session:
-        raise HTTPException(status_code=404, detail="Invalid session")
-
-    if session["status"] != "ORDERING":
-        raise HTTPException(status_code=400, detail="Cart already confirmed")
-
-    cart = get_json(f"cart:{req.session_id}") or []
-
-    for i, cart_item in enumerate(cart):
-        if cart_item["item_id"] == req.item_id:
-            cart_item["quantity"] -= 1
-            if cart_item["quantity"] <= 0:
-                cart.pop(i)
-
-            set_json(f"cart:{req.session_id}", cart, ttl=3600)
-            return {"message": "Item removed", "items": cart}
-
-    raise HTTPException(status_code=404, detail="Item not in cart")
+async def remove_from_cart(req: RemoveItemRequest):
+    status, cart, missing = await apply_cart_deltas_async(req.session_id, {req.item_id: -1})
+    raise_for_cart_status(status)
+
+    if missing:
+        raise HTTPException(status_code=404, detail="Item not in cart")
+    return {"message": "Item removed", "items": cart}
+
+
+def validate_cart_ops(ops: List[CartOp]) -> list:
+    """
+    Check every op against the menu catalog before anything is written;
+    one bad op rejects the whole batch (422, with the index of each).
+    """
+    if not ops or len(ops) > MAX_CART_OPS:
+        raise HTTPException(status_code=422, detail=f"Send 1 to {MAX_CART_OPS} operations")
+
+    valid, errors = [], []
+    for index, op in enumerate(ops):
+        item_id = op.item_id
+        if op.op not in CART_OPS:
+            errors.append({"index": index, "error": f"op must be one of {', '.join(CART_OPS)}"})
+            continue
+        if op.op != "remove":
+            # items no longer on the menu can still be removed
+            item = get_item_by_id(item_id)
+            if not item:
+                errors.append({"index": index, "error": "Item not found"})
+                continue
+            item_id = item["id"]
+        low = 0 if op.op == "set" else 1
+        if not low <= op.quantity <= MAX_QTY:
+            errors.append({"index": index, "error": f"quantity must be {low} to {MAX_QTY}"})
+            continue
+        valid.append((op.op, item_id, op.quantity))
+
+    if errors:
+        raise HTTPException(status_code=422, detail={"error": "Invalid operations", "ops": errors})
+    return valid
+
+
+@app.post("/cart/batch")
+async def batch_cart(req: CartBatchRequest):
+    # all ops in one script: the whole batch applies or (on a bad session) none does
+    ops = validate_cart_ops(req.ops)
+    status, cart, results = await apply_cart_ops_async(req.session_id, ops)
+    raise_for_cart_status(status)
+
+    return {"message": "Cart updated", "items": cart, "results": results}
 
 
 @app.get("/cart/{session_id}")
-def view_cart(session_id: str):
-    cart = get_json(f"cart:{session_id}")
-    if cart is None:
+async def view_cart(session_id: str):
+    session, cart = await get_session_and_cart_async(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Invalid session")
     return {"items": cart}
 
 
 @app.post("/cart/confirm")
-def confirm_cart(session_id: str):
-    session = get_json(f"session:{session_id}")
-    cart = get_json(f"cart:{session_id}")
+async def confirm_cart(session_id: str):
+    result, session, cart = await confirm_cart_async(session_id)
 
-    if not session:
+    if result == "NO_SESSION":
         raise HTTPException(status_code=404, detail="Invalid session")
 
-    if not cart:
-        raise HTTPException(status_code=400, detail="Cart is empty")
+    if result == "CONFLICT":
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "Order already placed", "status": session["status"]},
+        )
 
-    session["status"] = "CONFIRMED"
-    set_json(f"session:{session_id}", session, ttl=3600)
+    if result == "EMPTY_CART":
+        raise HTTPException(status_code=400, detail="Cart is empty")
 
     return {"message": "Cart confirmed", "items": cart}
 
@@ -172,124 +289,215 @@ def confirm_cart(session_id: str):
 # Order API
 # -------------------------------
 @app.post("/order/place")
-def place_order(session_id: str):
-    session = get_json(f"session:{session_id}")
-    cart = get_json(f"cart:{session_id}")
+async def place_order(session_id: str):
+    # state check, cart snapshot, order write and session update: one script
+    result, session, order = await place_order_async(session_id)
 
-    if not session:
+    if result == "NO_SESSION":
         raise HTTPException(status_code=404, detail="Invalid session")
 
-    if session["status"] != "CONFIRMED":
-        raise HTTPException(status_code=400, detail="Confirm cart first")
+    if result == "CONFLICT":
+        detail = (
+            {"error": "Order already placed", "order_id": session.get("order_id")}
+            if session["status"] == "PLACED"
+            else {"error": "Confirm cart first", "status": session["status"]}
+        )
+        raise HTTPException(status_code=409, detail=detail)
+
+    if result == "EMPTY_CART":
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    return {"order_id": order["order_id"], "session_id": session_id}
 
-    order_id = str(uuid.uuid4())
 
-    total = sum(item["price"] * item["quantity"] for item in cart)
+@app.get("/order/status/{order_id}")
+async def order_status(order_id: str):
+    order = await get_order_async(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order_view(order)
+
+
+@app.get("/order/stream/{order_id}")
+async def order_stream(order_id: str):
+    """
+    Server-Sent Events: the order now, then again on every change
+    ("order" events); comment lines keep idle connections open.
+    """
+    # watch before reading so a change in between is not lost
+    queue = watch_order(order_id)
+    try:
+        order = await get_order_async(order_id)
+    except Exception:
+        unwatch_order(order_id, queue)
+        raise
+    if not order:
+        unwatch_order(order_id, queue)
+        raise HTTPException(status_code=404, detail="Order not found")
 
-    set_json(
-        f"order:{order_id}",
-        {
-            "order_id": order_id,
-            "session_id": session_id,
-            "table_id": session["table_id"],
-            "items": cart,
-            "total": total,
-            "status": "PLACED",
-        },
-        ttl=86400,
+    async def events():
+        try:
+            yield format_sse("order", order_view(order))
+            while True:
+                try:
+                    update = await asyncio.wait_for(queue.get(), ORDER_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if update is None:
+                    # the subscription reconnected; changes may have been missed
+                    update = await get_order_async(order_id)
+                    if not update:
+                        return
+                yield format_sse("order", order_view(update))
+        finally:
+            unwatch_order(order_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    session["status"] = "PLACED"
-    set_json(f"session:{session_id}", session, ttl=3600)
+# -------------------------------
+# Kitchen
+# -------------------------------
+@app.get("/kitchen/stream/{station}")
+async def kitchen_stream(
+    station: str,
+    token: str | None = None,
+    x_admin_token: str | None = Header(default=None),
+):
+    """
+    Server-Sent Events for one kitchen station: "tickets" events carry
+    the orders this station got from the consumer group. A batch is
+    acknowledged once the next one is requested, i.e. after it was sent.
+    """
+    # EventSource cannot send headers, so the token may come as ?token=
+    require_admin(x_admin_token or token)
+    batches = KitchenConsumer(station).batches()
+
+    async def events():
+        try:
+            async for orders in batches:
+                if orders:
+                    yield format_sse("tickets", [order_view(o) for o in orders])
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            await batches.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return {"order_id": order_id, "session_id": session_id}
 
+@app.post("/kitchen/orders/{order_id}/status")
+async def kitchen_order_status(
+    order_id: str,
+    req: OrderStatusRequest,
+    x_admin_token: str | None = Header(default=None),
+):
+    require_admin(x_admin_token)
+    if req.status not in ORDER_TRANSITIONS:
+        raise HTTPException(status_code=400, detail=f"Status must be one of {sorted(ORDER_TRANSITIONS)}")
 
-@app.get("/order/status/{order_id}")
-def order_status(order_id: str):
-    order = get_json(f"order:{order_id}")
-    if not order:
+    result, order = await set_order_status_async(order_id, req.status)
+    if result == "NO_ORDER":
         raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    if result == "CONFLICT":
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "Invalid status change", "status": order["status"]},
+        )
+    return order_view(order)
+
+
+# -------------------------------
+# Order history (SQLite log, never Redis)
+# -------------------------------
+@app.get("/orders/history")
+async def get_order_history(
+    table_id: str | None = None,
+    day: str | None = None,
+    item_id: str | None = None,
+    limit: int = 50,
+    x_admin_token: str | None = Header(default=None),
+):
+    require_admin(x_admin_token)
+    limit = max(1, min(limit, 500))
+    orders = await asyncio.to_thread(order_history, table_id, day, item_id, limit)
+    return {"orders": orders}
+
+
+@app.get("/orders/items")
+async def get_item_sales(
+    day: str | None = None,
+    item_id: str | None = None,
+    x_admin_token: str | None = Header(default=None),
+):
+    require_admin(x_admin_token)
+    return {"items": await asyncio.to_thread(item_sales, day, item_id)}
+
 
 @app.post("/agent/chat")
-def agent_chat(req: AgentChatRequest):
+async def agent_chat(req: AgentChatRequest):
     text = req.message.strip()
     session_id = req.session_id
 
-    session = get_json(f"session:{session_id}")
+    session, cart = await get_session_and_cart_async(session_id)
     if not session:
         raise HTTPException(400, "Invalid session")
 
-    # -----------------------------
-    # 1️⃣ Intent detection (signal only)
-    # -----------------------------
-    intent_out = predict_intent(text)
-    intent = intent_out["intent"]
-    intent_conf = intent_out["confidence"]
-
-    # -----------------------------
-    # 2️⃣ NER extraction (signal only)
-    # -----------------------------
-    from ner.extract_items import extract_items
-    ner_result = extract_items(text, menu_items)
-
-    if ner_result.get("food_items"):
-        ner_conf = 1.0
-    elif ner_result.get("clarification"):
-        ner_conf = 0.6
-    else:
-        ner_conf = 0.3
-
-    # -----------------------------
-    # 3️⃣ Decide FLOW (simple & safe)
-    # -----------------------------
-    if ner_result.get("food_items") and not ner_result.get("clarification"):
-        flow = "EXECUTE"
-    elif ner_result.get("clarification"):
-        flow = "CLARIFICATION"
-    else:
-        flow = "EXECUTE"
-
-    # -----------------------------
-    # 4️⃣ ALWAYS call LLM (NO early return)
-    # -----------------------------
-    llm_out = run_llm_response(
-        user_text=text,
-        intent=intent,
-        intent_conf=intent_conf,
-        ner_result=ner_result,
-        ner_conf=ner_conf,
-        flow=flow,
-        menu_items=menu_items,
-    )
+    return await run_chat_turn(session_id, session, text, cart)
 
-    # -----------------------------
-    # 5️⃣ Backend cart mutation (ONLY here)
-    # -----------------------------
-    cart = None
-    if (
-        intent in ("ADD_ITEM", "REMOVE_ITEM")
-        and llm_out.get("action") in ("ADD_ITEM", "REMOVE_ITEM")
-        and session["status"] == "ORDERING"
-    ):
-        cart = apply_llm_cart_decision(session_id, llm_out)
-
-    # -----------------------------
-    # 6️⃣ Build response LAST
-    # -----------------------------
-    response = {
-        "intent": intent,
-        "intent_confidence": intent_conf,
-        "ner": ner_result,
-        "ner_confidence": ner_conf,
-        "llm": llm_out,
-    }
 
-    if cart is not None:
-        response["cart"] = cart
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    return response
+
+@app.post("/agent/chat/stream")
+async def agent_chat_stream(req: AgentChatRequest):
+    """
+    Server-Sent Events version of /agent/chat:
+    signals -> token* -> cart? -> final
+    """
+    text = req.message.strip()
+    session_id = req.session_id
+
+    session, cart = await get_session_and_cart_async(session_id)
+    if not session:
+        raise HTTPException(400, "Invalid session")
+
+    async def events():
+        async for event, data in stream_chat_turn(session_id, session, text, cart):
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/agent/stats")
+async def agent_stats():
+    return {
+        **path_stats(),
+        "llm_cache": await cache_stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "intent_batcher": intent_batcher.stats(),
+        "intent_cascade": cascade_stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "menu": catalog.stats(),
+        "near_cache": near_cache.stats(),
+        "order_events": order_events_stats(),
+        "order_log": order_log.stats(),
+        "idempotency": idempotency_stats(),
+        "redis_round_trips": round_trip_stats(),
+    }
 
 
 @app.get("/order_status.html", response_class=HTMLResponse)
@@ -0,0 +1,119 @@
+"""
+Pick the TF-IDF acceptance threshold for the intent cascade.
+
+Both stages are refit on a train split; on the held-out split we choose
+the lowest threshold (= most traffic kept off MiniLM) whose cascade
+accuracy stays within --max-drop of MiniLM alone.
+
+Run from the repo root after both models are trained:
+    python -m classifier.calibrate_cascade --max-drop 0.01
+"""
+import argparse
+import json
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+from classifier.intent_cascade import CASCADE_CONFIG_PATH
+
+DATA_PATH = Path("classifier/data/intent_data.csv")
+TFIDF_MODEL_PATH = Path("classifier/models/intent_clf.joblib")
+MINILM_MODEL_PATH = Path("classifier/models/intent_minilm.joblib")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--max-drop", type=float, default=0.01,
+                    help="max accuracy loss vs MiniLM alone")
+parser.add_argument("--test-size", type=float, default=0.25)
+parser.add_argument("--seed", type=int, default=42)
+args = parser.parse_args()
+
+# -----------------------
+# Load data (same cleaning as train_intent_miniLM.py)
+# -----------------------
+df_raw = pd.read_csv(DATA_PATH, header=None, names=["raw"])
+df_raw = df_raw[~df_raw["raw"].str.lower().isin(["text,label", "text,intent"])]
+
+df = df_raw["raw"].str.rsplit(",", n=1, expand=True)
+df.columns = ["text", "label"]
+df["text"] = df["text"].astype(str).str.lower().str.strip()
+df["label"] = df["label"].astype(str).str.upper().str.strip()
+df = df.dropna().drop_duplicates()
+
+X_train, X_test, y_train, y_test = train_test_split(
+    df["text"].tolist(),
+    df["label"].tolist(),
+    test_size=args.test_size,
+    stratify=df["label"],
+    random_state=args.seed,
+)
+y_test = np.array(y_test)
+
+print(f"Train: {len(X_train)} | Held-out: {len(X_test)}")
+
+# -----------------------
+# Refit both stages on the train split (same configs as production)
+# -----------------------
+tfidf = clone(joblib.load(TFIDF_MODEL_PATH))
+tfidf.fit(X_train, y_train)
+
+tfidf_probs = tfidf.predict_proba(X_test)
+tfidf_conf = tfidf_probs.max(axis=1)
+tfidf_pred = tfidf.classes_[tfidf_probs.argmax(axis=1)]
+
+embedder = joblib.load(MINILM_MODEL_PATH)["embedder"]
+clf = LogisticRegression(max_iter=2000, class_weight="balanced")
+clf.fit(embedder.encode(X_train), y_train)
+minilm_pred = clf.predict(embedder.encode(X_test))
+
+tfidf_ok = tfidf_pred == y_test
+minilm_ok = minilm_pred == y_test
+minilm_acc = minilm_ok.mean()
+
+print(f"TF-IDF alone: {tfidf_ok.mean():.4f}")
+print(f"MiniLM alone: {minilm_acc:.4f}")
+
+# -----------------------
+# Sweep thresholds
+# -----------------------
+best = None
+print("\nthreshold  coverage  accuracy")
+
+for t in np.unique(np.round(tfidf_conf, 3)):
+    accept = tfidf_conf >= t
+    acc = np.where(accept, tfidf_ok, minilm_ok).mean()
+    coverage = accept.mean()
+
+    if acc >= minilm_acc - args.max_drop and (best is None or coverage > best["coverage"]):
+        best = {"threshold": float(t), "coverage": float(coverage), "accuracy": float(acc)}
+
+if best is None:
+    best = {"threshold": 1.01, "coverage": 0.0, "accuracy": float(minilm_acc)}
+
+for t in sorted({0.5, 0.6, 0.7, 0.8, 0.9, best["threshold"]}):
+    accept = tfidf_conf >= t
+    acc = np.where(accept, tfidf_ok, minilm_ok).mean()
+    print(f"{t:9.3f}  {accept.mean():8.3f}  {acc:8.4f}")
+
+# -----------------------
+# Save
+# -----------------------
+config = {
+    **best,
+    "max_drop": args.max_drop,
+    "minilm_accuracy": float(minilm_acc),
+    "tfidf_accuracy": float(tfidf_ok.mean()),
+    "held_out": len(X_test),
+}
+
+CASCADE_CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+with open(CASCADE_CONFIG_PATH, "w", encoding="utf-8") as f:
+    json.dump(config, f, indent=2)
+
+print(
+    f"\n✅ threshold {best['threshold']:.3f} keeps {best['coverage']:.1%} of traffic "
+    f"off MiniLM at {best['accuracy']:.4f} accuracy → {CASCADE_CONFIG_PATH}"
+)
@@ -0,0 +1,104 @@
+"""
+Latency and agreement of the torch vs int8 ONNX intent backends.
+
+Run from the repo root after export_intent_onnx.py:
+    python -m classifier.compare_intent_backends
+"""
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from classifier.intent_minilm import load_torch_model, load_onnx_model
+
+# -----------------------
+# Paths / settings
+# -----------------------
+DATA_PATH = Path("classifier/data/intent_data.csv")
+BATCH_SIZE = 32
+LATENCY_SAMPLES = 200
+
+# -----------------------
+# Load data (same cleaning as train_intent_miniLM.py)
+# -----------------------
+df_raw = pd.read_csv(DATA_PATH, header=None, names=["raw"])
+df_raw = df_raw[~df_raw["raw"].str.lower().isin(["text,label", "text,intent"])]
+
+df = df_raw["raw"].str.rsplit(",", n=1, expand=True)
+df.columns = ["text", "label"]
+df["text"] = df["text"].astype(str).str.lower().str.strip()
+df["label"] = df["label"].astype(str).str.upper().str.strip()
+df = df.dropna().drop_duplicates()
+
+texts = df["text"].tolist()
+labels = np.array(df["label"].tolist())
+
+print("Samples:", len(texts))
+
+
+# -----------------------
+# Benchmark helpers
+# -----------------------
+def single_latency_ms(embedder, samples):
+    timings = []
+    for t in samples:
+        start = time.perf_counter()
+        embedder.encode([t])
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def encode_all(embedder):
+    start = time.perf_counter()
+    chunks = [
+        embedder.encode(texts[i:i + BATCH_SIZE])
+        for i in range(0, len(texts), BATCH_SIZE)
+    ]
+    elapsed = time.perf_counter() - start
+    return np.vstack(chunks), len(texts) / elapsed
+
+
+# -----------------------
+# Run both backends
+# -----------------------
+backends = {
+    "torch fp32": load_torch_model(),
+    "onnx int8": load_onnx_model(quantized=True),
+}
+
+results = {}
+sample = texts[:LATENCY_SAMPLES]
+
+for name, model in backends.items():
+    embedder, clf = model["embedder"], model["classifier"]
+
+    embedder.encode(sample[:8])  # warm-up
+    p50, p95 = single_latency_ms(embedder, sample)
+    embs, throughput = encode_all(embedder)
+    preds = clf.predict(embs)
+
+    results[name] = {"embs": embs, "preds": preds}
+
+    print(f"\n--- {name} ---")
+    print(f"single p50: {p50:.2f} ms | p95: {p95:.2f} ms")
+    print(f"batch({BATCH_SIZE}) throughput: {throughput:.0f} msg/s")
+    print(f"accuracy vs labels: {(preds == labels).mean():.4f}")
+
+# -----------------------
+# Agreement
+# -----------------------
+ref, cand = results["torch fp32"], results["onnx int8"]
+
+agreement = (ref["preds"] == cand["preds"]).mean()
+
+a = ref["embs"] / np.linalg.norm(ref["embs"], axis=1, keepdims=True)
+b = cand["embs"] / np.linalg.norm(cand["embs"], axis=1, keepdims=True)
+cos = (a * b).sum(axis=1)
+
+print("\n--- torch vs onnx ---")
+print(f"intent agreement: {agreement:.4f}")
+print(f"embedding cosine: mean {cos.mean():.4f} | min {cos.min():.4f}")
+
+disagree = np.flatnonzero(ref["preds"] != cand["preds"])[:10]
+for i in disagree:
+    print(f"  {texts[i]!r}: torch={ref['preds'][i]} onnx={cand['preds'][i]}")
@@ -0,0 +1,113 @@
+"""
+Bounded LRU of (embedding, class probabilities) keyed on normalized text.
+
+Short commands ("add coffee", "show cart") repeat constantly, so
+intent_minilm consults this before encoding. Entries are dropped as soon
+as any watched model file changes on disk.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+MODEL_CHECK_INTERVAL = float(os.getenv("EMBEDDING_CACHE_CHECK_INTERVAL", "2.0"))
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    def __init__(self, maxsize: int, watch_paths, on_model_change=None):
+        self.maxsize = maxsize
+        self._watch_paths = watch_paths          # callable -> list[Path]
+        self._on_model_change = on_model_change
+
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # bumped when the model changes; results computed under an older
+        # generation are not stored
+        self.generation = 0
+
+    # ---------- model file watch ----------
+    def _model_signature(self):
+        sig = []
+        for p in self._watch_paths():
+            try:
+                st = Path(p).stat()
+                sig.append((str(p), st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append((str(p), None, None))
+        return tuple(sig)
+
+    def _check_model(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + MODEL_CHECK_INTERVAL
+
+        signature = self._model_signature()
+        if self._signature is not None and signature != self._signature:
+            self._data.clear()
+            self.invalidations += 1
+            self.generation += 1
+            if self._on_model_change:
+                self._on_model_change()
+        self._signature = signature
+
+    # ---------- API ----------
+    def get(self, text: str, count: bool = True):
+        """
+        Returns (embedding, probs) or None. count=False for re-checks of a
+        text already counted, so hits/misses stay one per lookup.
+        """
+        key = normalize_text(text)
+        with self._lock:
+            self._check_model()
+            entry = self._data.get(key)
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry
+
+    def put(self, text: str, emb: np.ndarray, probs: np.ndarray, generation: int):
+        """
+        generation: self.generation read before the model was loaded.
+        """
+        key = normalize_text(text)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._data[key] = (emb, probs)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "invalidations": self.invalidations,
+        }
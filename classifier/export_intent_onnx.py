@@ -0,0 +1,108 @@
+import json
+import joblib
+import torch
+from pathlib import Path
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+# -----------------------
+# Paths
+# -----------------------
+MODEL_PATH = Path("classifier/models/intent_minilm.joblib")
+ONNX_DIR = Path("classifier/models/intent_minilm_onnx")
+FP32_PATH = ONNX_DIR / "embedder.onnx"
+INT8_PATH = ONNX_DIR / "embedder.int8.onnx"
+CLF_PATH = ONNX_DIR / "classifier.joblib"
+CONFIG_PATH = ONNX_DIR / "config.json"
+
+# -----------------------
+# Load trained model (see train_intent_miniLM.py)
+# -----------------------
+model = joblib.load(MODEL_PATH)
+embedder = model["embedder"]
+
+transformer = embedder[0].auto_model
+tokenizer = embedder.tokenizer
+normalize = any(type(m).__name__ == "Normalize" for m in embedder)
+
+
+# -----------------------
+# Transformer + mean pooling (+ L2 norm) as one graph
+# -----------------------
+class MeanPoolEncoder(torch.nn.Module):
+    def __init__(self, transformer, normalize: bool):
+        super().__init__()
+        self.transformer = transformer
+        self.normalize = normalize
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        hidden = self.transformer(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+        ).last_hidden_state
+
+        mask = attention_mask.unsqueeze(-1).to(hidden.dtype)
+        emb = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+
+        if self.normalize:
+            emb = torch.nn.functional.normalize(emb, p=2, dim=1)
+        return emb
+
+
+encoder = MeanPoolEncoder(transformer, normalize).eval()
+
+# -----------------------
+# Export fp32 ONNX
+# -----------------------
+ONNX_DIR.mkdir(parents=True, exist_ok=True)
+
+sample = tokenizer(
+    ["add two espresso", "show my cart"],
+    padding=True,
+    return_tensors="pt",
+)
+
+with torch.no_grad():
+    torch.onnx.export(
+        encoder,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        FP32_PATH,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["embedding"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "seq"},
+            "attention_mask": {0: "batch", 1: "seq"},
+            "token_type_ids": {0: "batch", 1: "seq"},
+            "embedding": {0: "batch"},
+        },
+        opset_version=14,
+        dynamo=False,  # TorchScript exporter: graph quantize_dynamic handles cleanly
+    )
+
+print(f"✅ fp32 ONNX embedder saved to {FP32_PATH}")
+
+# -----------------------
+# Dynamic int8 quantization (weights int8, activations quantized at runtime)
+# -----------------------
+quantize_dynamic(
+    model_input=str(FP32_PATH),
+    model_output=str(INT8_PATH),
+    weight_type=QuantType.QInt8,
+)
+
+print(f"✅ int8 ONNX embedder saved to {INT8_PATH}")
+
+# -----------------------
+# Tokenizer, classifier head and runtime config
+# -----------------------
+tokenizer.save_pretrained(ONNX_DIR)
+joblib.dump(model["classifier"], CLF_PATH)
+
+with open(CONFIG_PATH, "w", encoding="utf-8") as f:
+    json.dump(
+        {"max_seq_length": embedder.max_seq_length, "normalize": normalize},
+        f,
+        indent=2,
+    )
+
+print(f"✅ ONNX intent backend written to {ONNX_DIR}")
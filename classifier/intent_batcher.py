@@ -0,0 +1,133 @@
+"""
+Micro-batching front end for MiniLM intent prediction.
+
+Concurrent callers enqueue their text; one worker thread collects up to
+INTENT_BATCH_MAX_SIZE items or waits INTENT_BATCH_MAX_WAIT_MS after the
+first one, then runs a single encode + predict_proba for the batch.
+Usable from sync code (predict) and from the event loop (predict_async).
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from classifier import intent_minilm
+
+INTENT_BATCH_ENABLED = os.getenv("INTENT_BATCH_ENABLED", "1") == "1"
+INTENT_BATCH_MAX_SIZE = int(os.getenv("INTENT_BATCH_MAX_SIZE", "32"))
+INTENT_BATCH_MAX_WAIT_MS = float(os.getenv("INTENT_BATCH_MAX_WAIT_MS", "5"))
+
+
+class IntentBatcher:
+    def __init__(self, max_batch_size: int, max_wait_ms: float, predict_batch=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._predict_batch = predict_batch or intent_minilm.predict_intent_batch
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes: Counter = Counter()
+        self.cache_hits = 0
+
+    # ---------- worker ----------
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="intent-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run_batch(self, batch: list):
+        # callers that gave up (cancelled wrap_future) are dropped; the rest
+        # can no longer be cancelled, so resolving them below is safe
+        batch = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = [text for text, _ in batch]
+
+        self.batches += 1
+        self.items += len(batch)
+        self.batch_sizes[len(batch)] += 1
+
+        try:
+            results = self._predict_batch(texts)
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+
+        for (_, fut), result in zip(batch, results):
+            fut.set_result(result)
+
+    def _run(self):
+        # the worker is started once; nothing may end it
+        while True:
+            try:
+                self._run_batch(self._collect())
+            except Exception as e:
+                print(f"⚠️ intent batcher: {e}")
+
+    # ---------- API ----------
+    def submit(self, text: str) -> Future:
+        fut: Future = Future()
+
+        # repeated utterances never wait for a batch
+        hit = intent_minilm.cached_prediction(text)
+        if hit is not None:
+            self.cache_hits += 1
+            fut.set_result(hit)
+            return fut
+
+        self._ensure_started()
+        self._queue.put((text, fut))
+        return fut
+
+    def predict(self, text: str):
+        """
+        Blocking call; returns (intent_out, embedding).
+        """
+        return self.submit(text).result()
+
+    async def predict_async(self, text: str):
+        return await asyncio.wrap_future(self.submit(text))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": INTENT_BATCH_ENABLED,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "cache_hits": self.cache_hits,
+        }
+
+
+intent_batcher = IntentBatcher(INTENT_BATCH_MAX_SIZE, INTENT_BATCH_MAX_WAIT_MS)
@@ -0,0 +1,62 @@
+"""
+Cascade: cheap char-TF-IDF model first, MiniLM only when it is unsure.
+
+The acceptance threshold comes from calibrate_cascade.py
+(classifier/models/intent_cascade.json); INTENT_CASCADE_THRESHOLD
+overrides it.
+"""
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+from classifier import intent_classifier
+
+CASCADE_CONFIG_PATH = Path("classifier/models/intent_cascade.json")
+DEFAULT_THRESHOLD = 0.8
+
+# "minilm" (MiniLM only) or "cascade"
+INTENT_MODE = os.getenv("INTENT_MODE", "minilm")
+
+_threshold: float | None = None
+CASCADE_STATS: Counter = Counter()
+
+
+def load_threshold() -> float:
+    global _threshold
+    if _threshold is None:
+        if os.getenv("INTENT_CASCADE_THRESHOLD"):
+            _threshold = float(os.getenv("INTENT_CASCADE_THRESHOLD"))
+        elif CASCADE_CONFIG_PATH.exists():
+            with open(CASCADE_CONFIG_PATH, "r", encoding="utf-8") as f:
+                _threshold = float(json.load(f)["threshold"])
+        else:
+            _threshold = DEFAULT_THRESHOLD
+    return _threshold
+
+
+def first_stage(text: str) -> dict | None:
+    """
+    TF-IDF prediction if it clears the threshold, else None.
+    """
+    out = intent_classifier.predict_intent(text)
+    if out["confidence"] < load_threshold():
+        CASCADE_STATS["minilm"] += 1
+        return None
+
+    CASCADE_STATS["tfidf"] += 1
+    return {
+        "intent": str(out["intent"]).upper().strip(),
+        "confidence": out["confidence"],
+        "model": "tfidf",
+    }
+
+
+def cascade_stats() -> dict:
+    total = sum(CASCADE_STATS.values())
+    return {
+        "mode": INTENT_MODE,
+        "threshold": load_threshold() if INTENT_MODE == "cascade" else None,
+        "answered_by": dict(CASCADE_STATS),
+        "tfidf_share": round(CASCADE_STATS["tfidf"] / total, 3) if total else None,
+    }
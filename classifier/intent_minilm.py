@@ -1,27 +1,59 @@
+import os
 import joblib
 import numpy as np
 from pathlib import Path
 
+from classifier.embedding_cache import EmbeddingCache, EMBEDDING_CACHE_SIZE
+
 MODEL_PATH = Path("classifier/models/intent_minilm.joblib")
+ONNX_DIR = Path("classifier/models/intent_minilm_onnx")
+
+# "torch" (pickled SentenceTransformer) or "onnx" (int8 export)
+INTENT_BACKEND = os.getenv("INTENT_BACKEND", "torch")
 
 _model = None
 
 
+def load_torch_model() -> dict:
+    return joblib.load(MODEL_PATH)
+
+
+def load_onnx_model(quantized: bool = True) -> dict:
+    from classifier.onnx_embedder import OnnxEmbedder
+
+    return {
+        "embedder": OnnxEmbedder(ONNX_DIR, quantized=quantized),
+        "classifier": joblib.load(ONNX_DIR / "classifier.joblib"),
+    }
+
+
 def load_model():
     global _model
     if _model is None:
-        _model = joblib.load(MODEL_PATH)
+        if INTENT_BACKEND == "onnx":
+            _model = load_onnx_model()
+        else:
+            _model = load_torch_model()
     return _model
 
 
-def predict_intent(text: str):
-    model = load_model()
-    embedder = model["embedder"]
-    clf = model["classifier"]
+def model_files() -> list[Path]:
+    if INTENT_BACKEND == "onnx":
+        return [ONNX_DIR / "embedder.int8.onnx", ONNX_DIR / "classifier.joblib"]
+    return [MODEL_PATH]
 
-    emb = embedder.encode([text.lower()])[0]
-    probs = clf.predict_proba([emb])[0]
 
+def _reset_model():
+    global _model
+    _model = None
+
+
+# Shared by every component that needs a MiniLM vector for a message
+# (intent, semantic LLM cache, ...); cleared when the model file changes.
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_SIZE, model_files, _reset_model)
+
+
+def _result_from_probs(clf, probs) -> dict:
     idx = int(np.argmax(probs))
 
     return {
@@ -32,3 +64,66 @@ def predict_intent(text: str):
             for i in range(len(probs))
         ]
     }
+
+
+def cached_prediction(text: str, count: bool = True):
+    """
+    (intent_out, embedding) straight from the cache, or None. Runs on the
+    event loop (IntentBatcher.submit), so it never loads the model: right
+    after a model change it is a miss and the batch thread loads it.
+    """
+    cached = embedding_cache.get(text, count)
+    model = _model
+    if cached is None or model is None:
+        return None
+    emb, probs = cached
+    return _result_from_probs(model["classifier"], probs), emb
+
+
+def predict_intent_with_embedding(text: str):
+    """
+    Returns (intent_out, embedding) so callers can reuse the vector.
+    """
+    cached = embedding_cache.get(text)
+    generation = embedding_cache.generation
+    model = load_model()
+    clf = model["classifier"]
+    if cached is not None:
+        emb, probs = cached
+        return _result_from_probs(clf, probs), emb
+
+    emb = model["embedder"].encode([text.lower()])[0]
+    probs = clf.predict_proba([emb])[0]
+    embedding_cache.put(text, emb, probs, generation)
+    return _result_from_probs(clf, probs), emb
+
+
+def predict_intent(text: str):
+    return predict_intent_with_embedding(text)[0]
+
+
+def predict_intent_batch(texts: list[str]) -> list:
+    """
+    One encode + one predict_proba for the whole batch.
+    Returns [(intent_out, embedding), ...] in input order.
+    """
+    # IntentBatcher.submit() already counted these lookups; this re-check
+    # only catches texts cached while they waited for the batch
+    results = [cached_prediction(t, count=False) for t in texts]
+    misses = [i for i, r in enumerate(results) if r is None]
+    if not misses:
+        return results
+
+    generation = embedding_cache.generation
+    model = load_model()
+    clf = model["classifier"]
+
+    embs = model["embedder"].encode([texts[i].lower() for i in misses])
+    probs = clf.predict_proba(embs)
+
+    # a model change while encoding bumps the generation: not cached
+    for i, p, e in zip(misses, probs, embs):
+        embedding_cache.put(texts[i], e, p, generation)
+        results[i] = (_result_from_probs(clf, p), e)
+
+    return results
@@ -0,0 +1,49 @@
+import json
+import os
+import numpy as np
+from pathlib import Path
+
+
+class OnnxEmbedder:
+    """
+    Drop-in for SentenceTransformer.encode backed by the int8 ONNX export
+    (see export_intent_onnx.py). Returns the same (n, dim) float32 array.
+    """
+
+    def __init__(self, model_dir: Path, quantized: bool = True, threads: int | None = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+
+        with open(model_dir / "config.json", "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=config["max_seq_length"])
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or int(os.getenv("ONNX_THREADS", "0"))
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        model_file = "embedder.int8.onnx" if quantized else "embedder.onnx"
+        self.model_path = model_dir / model_file
+        self.session = ort.InferenceSession(
+            str(self.model_path),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: list[str], **_) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch(list(texts))
+
+        feeds = {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encoded], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encoded], dtype=np.int64),
+        }
+        feeds = {k: v for k, v in feeds.items() if k in self._inputs}
+
+        return self.session.run(None, feeds)[0]
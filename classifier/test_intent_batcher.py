@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sys
+import threading
+
+BASE_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+from classifier.intent_batcher import IntentBatcher
+
+
+def test_cancelled_waiter_does_not_stop_worker():
+    """
+    A caller that gives up while its text is queued (client dropped the
+    stream) must not take the worker down for everyone after it.
+    """
+    release = threading.Event()
+
+    def predict_batch(texts):
+        release.wait(5)
+        return [({"intent": "ADD_ITEM", "confidence": 1.0}, None) for _ in texts]
+
+    batcher = IntentBatcher(max_batch_size=8, max_wait_ms=1, predict_batch=predict_batch)
+
+    async def run():
+        # occupies the worker while the next request is queued behind it
+        first = asyncio.ensure_future(batcher.predict_async("show cart"))
+        await asyncio.sleep(0.05)
+        dropped = asyncio.ensure_future(batcher.predict_async("add coffee"))
+        await asyncio.sleep(0.05)
+        dropped.cancel()
+        release.set()
+        await first
+
+        intent_out, _ = await asyncio.wait_for(batcher.predict_async("add tea"), timeout=5)
+        return intent_out
+
+    intent_out = asyncio.run(run())
+    assert intent_out["intent"] == "ADD_ITEM"
+    assert batcher._thread.is_alive()
+
+
+def test_failed_batch_reaches_callers():
+    def predict_batch(texts):
+        raise RuntimeError("model not loaded")
+
+    batcher = IntentBatcher(max_batch_size=8, max_wait_ms=1, predict_batch=predict_batch)
+    try:
+        batcher.predict("add coffee")
+    except RuntimeError as e:
+        assert "model not loaded" in str(e)
+    else:
+        raise AssertionError("expected the batch error")
+    assert batcher._thread.is_alive()
+
+
+if __name__ == "__main__":
+    test_cancelled_waiter_does_not_stop_worker()
+    test_failed_batch_reaches_callers()
+    print("✅ intent batcher tests passed")
@@ -3,14 +3,52 @@ import ollama
 
 OLLAMA_MODEL = "llama3.2"   # change here only
 
+_async_client: ollama.AsyncClient | None = None
+
+
+def get_async_client() -> ollama.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = ollama.AsyncClient()
+    return _async_client
+
+
+def _options(temperature, max_tokens) -> dict:
+    return {
+        "temperature": temperature,
+        "num_predict": max_tokens
+    }
+
 
 def run_ollama(prompt: str, temperature=0.2, max_tokens=256) -> str:
     response = ollama.generate(
         model=OLLAMA_MODEL,
         prompt=prompt,
-        options={
-            "temperature": temperature,
-            "num_predict": max_tokens
-        }
+        options=_options(temperature, max_tokens)
+    )
+    return response["response"].strip()
+
+
+async def run_ollama_async(prompt: str, temperature=0.2, max_tokens=256) -> str:
+    response = await get_async_client().generate(
+        model=OLLAMA_MODEL,
+        prompt=prompt,
+        options=_options(temperature, max_tokens)
     )
     return response["response"].strip()
+
+
+async def stream_ollama_async(prompt: str, temperature=0.2, max_tokens=256):
+    """
+    Yield response fragments as Ollama produces them.
+    """
+    stream = await get_async_client().generate(
+        model=OLLAMA_MODEL,
+        prompt=prompt,
+        options=_options(temperature, max_tokens),
+        stream=True,
+    )
+    async for part in stream:
+        token = part.get("response")
+        if token:
+            yield token
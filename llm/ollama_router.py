@@ -1,4 +1,4 @@
-from llm.ollama_client import run_ollama
+from llm.ollama_client import run_ollama, run_ollama_async, stream_ollama_async
 from llm.ollama_parser import extract_json
 from llm.ollama_prompts import (
     llm_execute_prompt,
@@ -7,7 +7,15 @@ from llm.ollama_prompts import (
     llm_generic_prompt,
 )
 
-def run_llm_response(
+# Returned whenever the model output cannot be parsed
+LLM_FALLBACK = {
+    "action": "NONE",
+    "items": [],
+    "message": "Can you please clarify?",
+}
+
+
+def build_llm_input(
     user_text: str,
     intent: str,
     intent_conf: float,
@@ -15,14 +23,7 @@ def run_llm_response(
     ner_conf: float,
     flow: str,
     menu_items: list,
-):
-    """
-    ALWAYS returns a dict with keys:
-    - action
-    - items
-    - message
-    """
-
+) -> str:
     # -----------------------------
     # 1. Choose prompt (LLM SPEECH MODE)
     # -----------------------------
@@ -38,7 +39,7 @@ def run_llm_response(
     # -----------------------------
     # 2. Build LLM input (FULL CONTEXT)
     # -----------------------------
-    llm_input = f"""
+    return f"""
 {prompt}
 
 User message:
@@ -70,13 +71,10 @@ IMPORTANT RULES:
 - NEVER ask questions outside JSON.
 """
 
-    # -----------------------------
-    # 3. Call Ollama (ALWAYS)
-    # -----------------------------
-    raw_output = run_ollama(llm_input)
 
+def parse_llm_output(raw_output: str) -> dict:
     # -----------------------------
-    # 4. Parse JSON SAFELY
+    # Parse JSON SAFELY
     # -----------------------------
     try:
         parsed = extract_json(raw_output)
@@ -92,10 +90,68 @@ IMPORTANT RULES:
 
     except Exception as e:
         # -----------------------------
-        # 5. HARD FAILSAFE (NEVER BREAK FLOW)
+        # HARD FAILSAFE (NEVER BREAK FLOW)
         # -----------------------------
-        return {
-            "action": "NONE",
-            "items": [],
-            "message": "Can you please clarify?",
-        }
+        return dict(LLM_FALLBACK)
+
+
+def run_llm_response(
+    user_text: str,
+    intent: str,
+    intent_conf: float,
+    ner_result: dict,
+    ner_conf: float,
+    flow: str,
+    menu_items: list,
+):
+    """
+    ALWAYS returns a dict with keys:
+    - action
+    - items
+    - message
+    """
+    llm_input = build_llm_input(
+        user_text, intent, intent_conf, ner_result, ner_conf, flow, menu_items
+    )
+
+    # Call Ollama (ALWAYS)
+    return parse_llm_output(run_ollama(llm_input))
+
+
+async def run_llm_response_async(
+    user_text: str,
+    intent: str,
+    intent_conf: float,
+    ner_result: dict,
+    ner_conf: float,
+    flow: str,
+    menu_items: list,
+):
+    """
+    Same contract as run_llm_response, without blocking the event loop.
+    """
+    llm_input = build_llm_input(
+        user_text, intent, intent_conf, ner_result, ner_conf, flow, menu_items
+    )
+
+    return parse_llm_output(await run_ollama_async(llm_input))
+
+
+async def stream_llm_tokens_async(
+    user_text: str,
+    intent: str,
+    intent_conf: float,
+    ner_result: dict,
+    ner_conf: float,
+    flow: str,
+    menu_items: list,
+):
+    """
+    Yield raw LLM tokens; the caller joins them and runs parse_llm_output.
+    """
+    llm_input = build_llm_input(
+        user_text, intent, intent_conf, ner_result, ner_conf, flow, menu_items
+    )
+
+    async for token in stream_ollama_async(llm_input):
+        yield token
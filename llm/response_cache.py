@@ -0,0 +1,174 @@
+"""
+Two-level cache in front of run_llm_response.
+
+L1: small in-process LRU (hot entries never leave the worker).
+L2: Redis, TTL + LRU-style eviction through a per-menu-version sorted set.
+
+Key = menu version + flow + intent + ner_signal() + normalized user text,
+so a menu change can never serve a stale answer.
+"""
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+
+from llm.ollama_prompts import ner_signal
+from services.menu_service import catalog, get_menu_version
+from services.codec import codec
+from services.redis_store import ar, arb
+
+# -------------------------------
+# Config
+# -------------------------------
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_LOCAL_SIZE = int(os.getenv("LLM_CACHE_LOCAL_SIZE", "512"))
+LLM_CACHE_LOCAL_TTL = int(os.getenv("LLM_CACHE_LOCAL_TTL", "60"))
+
+
+# -------------------------------
+# Keys
+# -------------------------------
+def normalize_text(text: str) -> str:
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _prefix(version: str) -> str:
+    # hash tag keeps entries, LRU index and stats in one cluster slot
+    return f"llmcache:{{{version}}}"
+
+
+def cache_key(flow: str, intent: str, ner: dict, user_text: str) -> str:
+    signal = "|".join([flow, intent, ner_signal(ner), normalize_text(user_text)])
+    digest = hashlib.sha1(signal.encode("utf-8")).hexdigest()
+    return f"{_prefix(get_menu_version())}:{digest}"
+
+
+# -------------------------------
+# L1: in-process LRU
+# -------------------------------
+class LocalLRU:
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: str, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_local = LocalLRU(LLM_CACHE_LOCAL_SIZE, LLM_CACHE_LOCAL_TTL)
+_local_hits = 0
+
+# old-version keys can never be hit again; Redis entries expire by TTL
+catalog.on_change(lambda snapshot: _local.clear())
+
+
+# -------------------------------
+# L2: Redis (one round trip per call)
+# -------------------------------
+# Entries are stored through services/codec.py (binary client).
+# KEYS: entry, lru index, stats   ARGV: now
+_GET_SCRIPT = arb.register_script("""
+local v = redis.call('GET', KEYS[1])
+if v then
+  redis.call('ZADD', KEYS[2], 'XX', ARGV[1], KEYS[1])
+  redis.call('HINCRBY', KEYS[3], 'hits', 1)
+else
+  redis.call('HINCRBY', KEYS[3], 'misses', 1)
+end
+return v
+""")
+
+# KEYS: entry, lru index   ARGV: value, ttl, now, max_entries
+_PUT_SCRIPT = arb.register_script("""
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], KEYS[1])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+if excess > 0 then
+  local old = redis.call('ZPOPMIN', KEYS[2], excess)
+  for i = 1, #old, 2 do
+    redis.call('DEL', old[i])
+  end
+end
+return excess
+""")
+
+
+def _lru_key(key: str) -> str:
+    return key.rsplit(":", 1)[0] + ":lru"
+
+
+def _stats_key(key: str) -> str:
+    return key.rsplit(":", 1)[0] + ":stats"
+
+
+async def get_cached(key: str) -> dict | None:
+    global _local_hits
+
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    value = _local.get(key)
+    if value is not None:
+        _local_hits += 1
+        return value
+
+    raw = await _GET_SCRIPT(
+        keys=[key, _lru_key(key), _stats_key(key)],
+        args=[time.time()],
+    )
+    if raw is None:
+        return None
+
+    value = codec.decode(raw)
+    _local.put(key, value)
+    return value
+
+
+async def put_cached(key: str, value: dict):
+    if not LLM_CACHE_ENABLED:
+        return
+
+    _local.put(key, value)
+    await _PUT_SCRIPT(
+        keys=[key, _lru_key(key)],
+        args=[codec.encode(value), LLM_CACHE_TTL, time.time(), LLM_CACHE_MAX_ENTRIES],
+    )
+
+
+async def cache_stats() -> dict:
+    prefix = _prefix(get_menu_version())
+    redis_stats = await ar.hgetall(f"{prefix}:stats")
+    return {
+        "enabled": LLM_CACHE_ENABLED,
+        "local_hits": _local_hits,
+        "local_size": len(_local),
+        "redis_hits": int(redis_stats.get("hits", 0)),
+        "redis_misses": int(redis_stats.get("misses", 0)),
+        "redis_entries": await ar.zcard(f"{prefix}:lru"),
+    }
@@ -0,0 +1,110 @@
+"""
+Semantic LLM cache: reuse the answer of the nearest previous message.
+
+Rows live in one contiguous float32 matrix of unit vectors, so lookup is
+a single matrix-vector product. A row only matches when intent, NER
+signal and menu version are identical, and similarity clears the
+threshold; capacity is fixed and the least recently used row is
+overwritten when full.
+"""
+import os
+
+import numpy as np
+
+from llm.ollama_prompts import ner_signal
+from services.menu_service import catalog, get_menu_version
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_CAPACITY = int(os.getenv("SEMANTIC_CACHE_CAPACITY", "4096"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+
+class SemanticCache:
+    def __init__(self, capacity: int, threshold: float):
+        self.capacity = capacity
+        self.threshold = threshold
+
+        self._matrix: np.ndarray | None = None       # (capacity, dim), lazily sized
+        self._tags = np.zeros(capacity, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._values: list = [None] * capacity
+        self._size = 0
+        self._clock = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- helpers ----------
+    @staticmethod
+    def _tag(intent: str, ner: dict) -> int:
+        return hash((intent, ner_signal(ner), get_menu_version()))
+
+    @staticmethod
+    def _unit(emb) -> np.ndarray:
+        v = np.asarray(emb, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    # ---------- API ----------
+    def lookup(self, emb, intent: str, ner: dict) -> dict | None:
+        if self._size == 0:
+            self.misses += 1
+            return None
+
+        q = self._unit(emb)
+        n = self._size
+
+        sims = self._matrix[:n] @ q
+        sims[self._tags[:n] != self._tag(intent, ner)] = -1.0
+
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        self._last_used[best] = self._tick()
+        self.hits += 1
+        return self._values[best]
+
+    def add(self, emb, intent: str, ner: dict, value: dict):
+        q = self._unit(emb)
+
+        if self._matrix is None:
+            self._matrix = np.zeros((self.capacity, q.shape[0]), dtype=np.float32)
+
+        if self._size < self.capacity:
+            row = self._size
+            self._size += 1
+        else:
+            row = int(np.argmin(self._last_used))
+
+        self._matrix[row] = q
+        self._tags[row] = self._tag(intent, ner)
+        self._values[row] = value
+        self._last_used[row] = self._tick()
+
+    def clear(self):
+        self._tags[:] = 0
+        self._values = [None] * self.capacity
+        self._size = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": SEMANTIC_CACHE_ENABLED,
+            "size": self._size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+
+semantic_cache = SemanticCache(SEMANTIC_CACHE_CAPACITY, SEMANTIC_CACHE_THRESHOLD)
+
+# rows tagged with the old menu version can never match again
+catalog.on_change(lambda snapshot: semantic_cache.clear())
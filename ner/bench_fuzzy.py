@@ -0,0 +1,74 @@
+"""
+Fuzzy fallback of extract_items: per-token extractOne vs FuzzyIndex.
+
+Messages carry one misspelled item word (the case that reaches the
+fallback). Also checks both return the same matches. Run from the repo root:
+    python -m ner.bench_fuzzy
+"""
+import random
+import time
+
+from rapidfuzz import fuzz, process
+
+from ner.bench_matcher import synth_menu
+from ner.fuzzy_index import FuzzyIndex
+
+random.seed(7)
+
+SIZES = [40, 1000, 5000, 10000]
+MESSAGES = 200
+CUTOFF = 85
+
+
+def typo(word: str) -> str:
+    if len(word) <= 3:
+        return word
+    i = random.randrange(len(word))
+    return word[:i] + word[i + 1:]
+
+
+def synth_tokens(menu: list[str]) -> list[list[str]]:
+    return [
+        ["add", "two", typo(random.choice(menu).split()[-1]), "please"]
+        for _ in range(MESSAGES)
+    ]
+
+
+def extract_one(tokens: list[str], menu: list[str]) -> list:
+    out = []
+    for t in tokens:
+        hit = process.extractOne(t, menu, scorer=fuzz.partial_ratio, score_cutoff=CUTOFF)
+        out.append(hit[0] if hit else None)
+    return out
+
+
+def main():
+    print(f"{'items':>7} {'build ms':>9} {'extractOne µs':>14} {'index µs':>9} {'speedup':>8} {'same':>5}")
+
+    for size in SIZES:
+        menu = synth_menu(size)
+        messages = synth_tokens(menu)
+
+        start = time.perf_counter()
+        index = FuzzyIndex(menu)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        expected = [extract_one(tokens, menu) for tokens in messages]
+        base_us = (time.perf_counter() - start) / len(messages) * 1e6
+
+        start = time.perf_counter()
+        got = [index.best_matches(tokens, CUTOFF) for tokens in messages]
+        index_us = (time.perf_counter() - start) / len(messages) * 1e6
+
+        same = all(
+            [h[0] if h else None for h in row] == exp for row, exp in zip(got, expected)
+        )
+        print(
+            f"{size:>7} {build_ms:>9.1f} {base_us:>14.0f} {index_us:>9.0f}"
+            f" {base_us / index_us:>7.1f}x {str(same):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Exact-match stage of extract_items: substring scan vs Aho-Corasick.
+
+Synthesizes menus from ~40 to 10k names and times both on the same
+messages. Run from the repo root:
+    python -m ner.bench_matcher
+"""
+import itertools
+import random
+import time
+
+from ner.menu_matcher import MenuMatcher
+from ner.postprocess import load_menu_items
+
+random.seed(42)
+
+SIZES = [40, 200, 1000, 5000, 10000]
+MESSAGES = 500
+
+BASE_ITEMS = load_menu_items("data/menu.json")
+ADJECTIVES = [
+    "spicy", "classic", "smoked", "double", "mini", "jumbo", "crispy", "loaded",
+    "tandoori", "peri peri", "honey", "garlic", "masala", "cheesy", "grilled",
+    "chilli", "herb", "lemon", "mango", "butter", "royal", "street", "house",
+]
+TEMPLATES = [
+    "add {item}", "two {item} please", "remove one {item}", "can i get {item} and {other}",
+    "i want {item}s", "show my cart", "what do you suggest", "add 3 {item} to my order",
+]
+
+
+def synth_menu(size: int) -> list[str]:
+    menu = list(BASE_ITEMS)
+    for n in itertools.count(1):
+        for adj, base in itertools.product(ADJECTIVES, BASE_ITEMS):
+            if len(menu) >= size:
+                return menu[:size]
+            menu.append(f"{adj} {base}" if n == 1 else f"{adj} {base} {n}")
+    return menu
+
+
+def synth_messages(menu: list[str]) -> list[str]:
+    return [
+        random.choice(TEMPLATES).format(item=random.choice(menu), other=random.choice(menu))
+        for _ in range(MESSAGES)
+    ]
+
+
+def scan(text: str, menu: list[str]) -> list[str]:
+    return [item for item in menu if item in text]
+
+
+def per_message_us(fn, messages) -> float:
+    start = time.perf_counter()
+    for m in messages:
+        fn(m)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    print(f"{'items':>7} {'build ms':>9} {'scan µs':>9} {'AC µs':>8} {'speedup':>8}")
+
+    for size in SIZES:
+        menu = synth_menu(size)
+        messages = synth_messages(menu)
+
+        start = time.perf_counter()
+        matcher = MenuMatcher(menu)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        scan_us = per_message_us(lambda m: scan(m, menu), messages)
+        ac_us = per_message_us(matcher.match, messages)
+
+        print(f"{size:>7} {build_ms:>9.1f} {scan_us:>9.1f} {ac_us:>8.1f} {scan_us / ac_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
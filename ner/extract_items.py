@@ -1,13 +1,12 @@
 import re
-from rapidfuzz import process, fuzz
+
+from ner.menu_lexicon import get_lexicon
 
 WORD_TO_NUM = {
     "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
     "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
 }
 
-GENERIC_HEADS = {"paneer", "burger", "sandwich", "pizza", "coffee"}
-
 def extract_quantity(text: str) -> int | None:
     tokens = re.findall(r"\b\w+\b", text.lower())
     for t in tokens:
@@ -18,50 +17,64 @@ def extract_quantity(text: str) -> int | None:
     return None
 
 
-def extract_items(text: str, menu_items: list[str]):
+def extract_items(text: str, menu_items: list[str], menu_version: str | None = None):
     text = text.lower()
     quantity = extract_quantity(text) or 1
 
+    lexicon = get_lexicon(menu_items, menu_version)
     found_items = []
     ambiguities = []
 
-    tokens = re.findall(r"\b\w+\b", text)
+    tokens = [(m.start(), m.end(), m.group()) for m in re.finditer(r"\b\w+\b", text)]
 
-    # --- Exact & plural match ---
-    for item in menu_items:
-        if item in text:
-            found_items.append(item)
+    # --- Exact & plural match (single Aho-Corasick pass) ---
+    hits = lexicon.matcher.find_all(text)
+    spans = lexicon.matcher.match(text, hits)
+    for _, _, item in spans:
+        found_items.append(item)
 
-    # --- Token-wise fuzzy match (fallback) ---
-    if not found_items:
-        for t in tokens:
-            match, score, _ = process.extractOne(
-                t, menu_items, scorer=fuzz.partial_ratio
-            ) or (None, 0, None)
+    # "exact": items from the matcher; "fuzzy": best guesses from the index
+    match = "exact" if found_items else None
 
-            if score >= 85:
-                found_items.append(match)
+    # --- Token-wise fuzzy match (fallback, one batched cdist) ---
+    if not found_items:
+        words = [t for _, _, t in tokens]
+        for hit in lexicon.fuzzy_index.best_matches(words, 85):
+            if hit:
+                found_items.append(hit[0])
+        if found_items:
+            match = "fuzzy"
 
-    # --- Generic head ambiguity ---
-    for t in tokens:
-        if t in GENERIC_HEADS:
-            options = [m for m in menu_items if t in m]
-            if options:
-                ambiguities.append({
-                    "ambiguous": t,
-                    "options": options
-                })
+    # --- Bare-word ambiguity: a generic head ("pizza") or a leading word
+    # several names share ("paneer"). Words inside any menu-name hit are
+    # skipped, overlapping ones included: in "chocolate brownie with ice
+    # cream" the word "chocolate" belongs to "chocolate brownie" even
+    # though the longer "brownie with ice cream" is the item matched. ---
+    for i, (start, end, t) in enumerate(tokens):
+        if any(s <= start and end <= e for s, e, _ in hits):
+            continue
+        options = lexicon.ambiguous_options(t)
+        if options:
+            # "ice cream" rather than "cream" when the phrase is just as ambiguous
+            if i and lexicon.suffix_items(f"{tokens[i - 1][2]} {t}") == options:
+                t = f"{tokens[i - 1][2]} {t}"
+            ambiguities.append({
+                "ambiguous": t,
+                "options": list(options)
+            })
 
     # --- Final result ---
     if ambiguities:
         return {
             "quantity": quantity,
             "food_items": [],
+            "match": None,
             "clarification": ambiguities
         }
 
     return {
         "quantity": quantity,
-        "food_items": list(set(found_items)),
+        "food_items": sorted(set(found_items)),
+        "match": match,
         "clarification": []
     }
@@ -0,0 +1,138 @@
+"""
+Blocked, batched fuzzy matching.
+
+Step 1: a character n-gram inverted index keeps, per query, only the
+choices sharing enough n-gram occurrences to possibly reach the score
+cutoff (queries shorter than n fall back to a substring filter).
+Step 2: all of a message's queries are scored against the union of
+those candidates in ONE rapidfuzz.process.cdist call.
+
+The "enough" bound is the q-gram lemma for partial_ratio: if the
+shorter string and an aligned window share M characters in r runs,
+at least M - (n-1)*r of the query's n-grams occur in the choice, and
+cutoff fixes the smallest possible M. Blocking therefore never drops
+the best match. n defaults to 2 (trigrams cannot certify short typos
+like "vneg" -> "veg biryani").
+
+Candidates keep their original list order and ties resolve to the lowest
+index, matching process.extractOne. Small choice lists (e.g. the generic
+heads) and scorers other than partial_ratio skip blocking.
+"""
+import math
+from collections import defaultdict
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+MIN_INDEXED_CHOICES = 64
+
+
+def ngram_list(text: str, q: int) -> list[str]:
+    return [text[i:i + q] for i in range(len(text) - q + 1)]
+
+
+def min_shared_ngrams(short_len: int, cutoff: float, q: int) -> float:
+    """
+    Lower bound on shared query n-gram occurrences for a pair whose
+    shorter side has short_len chars to reach partial_ratio >= cutoff.
+    inf when no alignment can reach the cutoff.
+    """
+    bound = math.inf
+    for w in range(1, short_len + 1):
+        m = math.ceil(cutoff * (short_len + w) / 200 - 1e-9)
+        if m > w:
+            continue
+        runs = (short_len - m) + (w - m) + 1
+        bound = min(bound, m - (q - 1) * runs)
+    return max(bound, 0)
+
+
+class FuzzyIndex:
+    def __init__(self, choices, scorer=fuzz.partial_ratio, q: int = 2):
+        self.choices = list(choices)
+        self.scorer = scorer
+        self.q = q
+        self.blocked = (
+            scorer is fuzz.partial_ratio and len(self.choices) >= MIN_INDEXED_CHOICES
+        )
+
+        self._all = np.arange(len(self.choices))
+        self._lengths = np.array([len(c) for c in self.choices], dtype=np.int64)
+        self._postings: dict[str, np.ndarray] = {}
+        self._bounds: dict[float, np.ndarray] = {}
+        self._short_queries: dict[str, np.ndarray] = {}
+
+        if self.blocked:
+            postings = defaultdict(list)
+            for i, choice in enumerate(self.choices):
+                for g in set(ngram_list(choice, q)):
+                    postings[g].append(i)
+            self._postings = {g: np.array(ids) for g, ids in postings.items()}
+
+    # ---------- step 1: blocking ----------
+    def _bound_table(self, cutoff: float) -> np.ndarray:
+        table = self._bounds.get(cutoff)
+        if table is None:
+            longest = int(self._lengths.max(initial=0)) + 1
+            table = np.array(
+                [0.0 if n < self.q else min_shared_ngrams(n, cutoff, self.q) for n in range(longest)]
+            )
+            self._bounds[cutoff] = table
+        return table
+
+    def _query_candidates(self, query: str, cutoff: float) -> np.ndarray:
+        if len(query) < self.q:
+            hit = self._short_queries.get(query)
+            if hit is None:
+                hit = np.array(
+                    [i for i, c in enumerate(self.choices) if query in c],
+                    dtype=np.int64,
+                )
+                self._short_queries[query] = hit
+            return hit
+
+        lists = [self._postings[g] for g in ngram_list(query, self.q) if g in self._postings]
+        if lists:
+            shared = np.bincount(np.concatenate(lists), minlength=len(self.choices))
+        else:
+            shared = np.zeros(len(self.choices), dtype=np.int64)
+
+        table = self._bound_table(cutoff)
+        need = table[np.minimum(len(query), self._lengths)]
+        return np.flatnonzero(shared >= need)
+
+    def candidates(self, queries: list[str], cutoff: float) -> np.ndarray:
+        if not self.blocked:
+            return self._all
+        return np.unique(np.concatenate([self._query_candidates(q, cutoff) for q in queries]))
+
+    # ---------- step 2: one cdist ----------
+    def best_matches(self, queries: list[str], score_cutoff: float) -> list:
+        """
+        For each query: (choice, score) of the best choice scoring
+        >= score_cutoff, else None.
+        """
+        if not queries:
+            return []
+
+        cand = self.candidates(queries, score_cutoff)
+        if len(cand) == 0:
+            return [None] * len(queries)
+
+        scores = process.cdist(
+            queries,
+            [self.choices[i] for i in cand],
+            scorer=self.scorer,
+            score_cutoff=score_cutoff,
+            dtype=np.float64,
+        )
+
+        best = scores.argmax(axis=1)
+        results = []
+        for row, col in enumerate(best):
+            score = float(scores[row, col])
+            if score >= score_cutoff:
+                results.append((self.choices[cand[col]], score))
+            else:
+                results.append(None)
+        return results
@@ -0,0 +1,100 @@
+"""
+Menu lexicon shared by extract_items and postprocess_ner.
+
+Built once per menu version. Generic heads are derived from the names
+themselves: a head is the last word of a name ("pizza" in "margherita
+pizza"), and it is generic when two or more names end with it. All
+ambiguity lookups are dict hits:
+    head_options("pizza")      -> names ending in the word "pizza"
+    prefix_items("paneer")     -> names starting with the words "paneer ..."
+    suffix_items("ice cream")  -> names ending with the words "... ice cream"
+The Aho-Corasick matcher and fuzzy index for the same list hang off it.
+"""
+from collections import defaultdict
+from functools import cached_property
+
+from rapidfuzz import fuzz
+
+from ner.fuzzy_index import FuzzyIndex
+from ner.menu_matcher import MenuMatcher
+
+
+class MenuLexicon:
+    def __init__(self, menu_items: list[str]):
+        self.menu_items = list(menu_items)
+        self.items = frozenset(self.menu_items)
+
+        prefixes = defaultdict(list)
+        suffixes = defaultdict(list)
+
+        # menu order is kept inside every option list
+        for item in self.menu_items:
+            words = item.split()
+            for k in range(1, len(words)):
+                prefixes[" ".join(words[:k])].append(item)
+            for k in range(1, len(words) + 1):
+                suffixes[" ".join(words[-k:])].append(item)
+
+        self._prefixes = {k: tuple(v) for k, v in prefixes.items()}
+        self._suffixes = {k: tuple(v) for k, v in suffixes.items()}
+
+        self.generic_heads = frozenset(
+            phrase for phrase, names in self._suffixes.items()
+            if " " not in phrase and len(names) >= 2
+        )
+
+    # ---------- lookups ----------
+    def prefix_items(self, phrase: str) -> tuple:
+        return self._prefixes.get(phrase, ())
+
+    def suffix_items(self, phrase: str) -> tuple:
+        return self._suffixes.get(phrase, ())
+
+    def head_options(self, word: str) -> tuple:
+        return self._suffixes.get(word, ()) if word in self.generic_heads else ()
+
+    def ambiguous_options(self, word: str) -> tuple:
+        """
+        Options when a bare word names several dishes: a generic head
+        ("pizza") or a shared leading word ("paneer", "veg"). () otherwise.
+        """
+        options = self.head_options(word)
+        if options:
+            return options
+        options = self.prefix_items(word)
+        return options if len(options) >= 2 else ()
+
+    # ---------- matchers over the same list ----------
+    @cached_property
+    def matcher(self) -> MenuMatcher:
+        return MenuMatcher(self.menu_items)
+
+    @cached_property
+    def fuzzy_index(self) -> FuzzyIndex:
+        return FuzzyIndex(self.menu_items, scorer=fuzz.partial_ratio)
+
+    @cached_property
+    def head_index(self) -> FuzzyIndex:
+        return FuzzyIndex(sorted(self.generic_heads), scorer=fuzz.ratio)
+
+
+_lexicon_version = None
+_lexicon: MenuLexicon | None = None
+
+
+def get_lexicon(menu_items: list[str], version: str | None = None) -> MenuLexicon:
+    """
+    Lexicon for this menu, keyed on the catalog's menu version only and
+    rebuilt when it changes. version defaults to the current one, so
+    menu_items must be that menu's names.
+    """
+    global _lexicon_version, _lexicon
+
+    if version is None:
+        from services.menu_service import get_menu_version
+
+        version = get_menu_version()
+    if _lexicon is None or version != _lexicon_version:
+        _lexicon = MenuLexicon(menu_items)
+        _lexicon_version = version
+    return _lexicon
@@ -0,0 +1,110 @@
+"""
+Aho-Corasick matcher over menu names/aliases.
+
+Built once per menu; one pass over the message finds every exact and
+plural ("s"/"es") occurrence on word boundaries, with positions so
+overlapping hits resolve longest-first ("cold coffee" beats "coffee").
+"""
+from collections import deque
+
+PLURAL_SUFFIXES = ("", "s", "es")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class MenuMatcher:
+    def __init__(self, menu_items: list[str]):
+        self.patterns = sorted({m.strip().lower() for m in menu_items if m.strip()})
+
+        self._goto: list[dict] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+
+        for pid, pattern in enumerate(self.patterns):
+            self._insert(pattern, pid)
+        self._build_links()
+
+    # ---------- build ----------
+    def _insert(self, pattern: str, pid: int):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(pid)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    # ---------- search ----------
+    def _plural_end(self, text: str, end: int) -> int | None:
+        """
+        End of the match including an optional plural suffix, if the
+        match (or match + suffix) ends on a word boundary.
+        """
+        for suffix in PLURAL_SUFFIXES:
+            stop = end + len(suffix)
+            if text.startswith(suffix, end) and (stop == len(text) or not _is_word_char(text[stop])):
+                return stop
+        return None
+
+    def find_all(self, text: str) -> list[tuple[int, int, str]]:
+        """
+        Every boundary-aligned hit as (start, end, item), overlaps included.
+        """
+        text = text.lower()
+        hits = []
+        node = 0
+
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+
+            for pid in self._out[node]:
+                item = self.patterns[pid]
+                start = i + 1 - len(item)
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                end = self._plural_end(text, i + 1)
+                if end is not None:
+                    hits.append((start, end, item))
+
+        return hits
+
+    def match(self, text: str, hits: list | None = None) -> list[tuple[int, int, str]]:
+        """
+        Non-overlapping hits, longest first, returned in text order.
+        hits: find_all(text) when the caller already has it.
+        """
+        chosen = []
+        taken = []
+
+        if hits is None:
+            hits = self.find_all(text)
+        for start, end, item in sorted(hits, key=lambda h: (h[0] - h[1], h[0])):
+            if any(start < e and s < end for s, e in taken):
+                continue
+            taken.append((start, end))
+            chosen.append((start, end, item))
+
+        return sorted(chosen)
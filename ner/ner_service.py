@@ -2,7 +2,8 @@
 
 import spacy
 import os
-from ner.postprocess import load_menu_items
+from services.menu_service import catalog, get_menu_snapshot
+from ner.menu_lexicon import get_lexicon
 
 BASE_DIR = os.path.dirname(__file__)
 
@@ -13,9 +14,17 @@ NER_MODEL_PATH = os.path.join(BASE_DIR, "models", "ner")
 nlp_ner = spacy.load(NER_MODEL_PATH)
 
 # -------------------------------
-# Load menu items ONCE
+# Menu vocabulary (lowercase names + aliases) from the catalog
 # -------------------------------
-MENU_PATH = os.path.join(BASE_DIR, "..", "data", "menu.json")
-menu_items = load_menu_items(MENU_PATH)
+menu_items = list(get_menu_snapshot().names)
+
+
+@catalog.on_change
+def _reload_menu_items(snapshot):
+    # same list object, so modules that imported it see the new menu;
+    # matchers are built here rather than on the first request after the swap
+    menu_items[:] = snapshot.names
+    lexicon = get_lexicon(menu_items, snapshot.version)
+    lexicon.matcher, lexicon.fuzzy_index, lexicon.head_index
 
 print("✅ NER model and menu loaded")
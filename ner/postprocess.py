@@ -1,8 +1,9 @@
 import json
 import re
-from rapidfuzz import process, fuzz
 from typing import Dict, Any, List
 
+from ner.menu_lexicon import MenuLexicon, get_lexicon
+
 # -------------------------------
 # Constants
 # -------------------------------
@@ -11,7 +12,7 @@ WORD_TO_NUM = {
     "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
 }
 
-GENERIC_HEADS = {"naan", "dosa", "paneer", "paratha", "sandwich", "roti"}
+_NOT_COMPUTED = object()
 
 
 # -------------------------------
@@ -31,7 +32,7 @@ def load_menu_items(menu_path: str) -> List[str]:
             for a in it.get("aliases", []):
                 items.append(a.strip().lower())
 
-    return list(set(items))
+    return sorted(set(items))
 
 
 # -------------------------------
@@ -47,39 +48,55 @@ def normalize_quantity(text: str):
 # -------------------------------
 # Food item normalization
 # -------------------------------
-def normalize_food_item(raw: str, menu_items: list, threshold: int = 80):
+def clean_food_text(raw: str) -> str:
     raw = raw.lower().strip()
-    raw = re.sub(r"[^\w\s]", "", raw)
+    return re.sub(r"[^\w\s]", "", raw)
+
+
+def normalize_food_item(
+    raw: str,
+    menu_items: list | MenuLexicon,
+    threshold: int = 80,
+    head_match=_NOT_COMPUTED,
+):
+    """
+    menu_items: the menu list or its MenuLexicon.
+    head_match: precomputed (head, score) | None from a batched fuzzy
+    pass (see postprocess_ner); computed here when not given.
+    """
+    lexicon = menu_items if isinstance(menu_items, MenuLexicon) else get_lexicon(menu_items)
+    raw = clean_food_text(raw)
 
     # Exact
-    if raw in menu_items:
+    if raw in lexicon.items:
         return raw
 
     # Singular
-    if raw.endswith("s") and raw[:-1] in menu_items:
+    if raw.endswith("s") and raw[:-1] in lexicon.items:
         return raw[:-1]
 
     # Generic head → ALWAYS ambiguous
-    if raw in GENERIC_HEADS:
+    if raw in lexicon.generic_heads:
         return {
             "ambiguous": raw,
-            "options": [m for m in menu_items if m.endswith(raw)]
+            "options": list(lexicon.head_options(raw))
         }
 
     # Partial match
-    partials = [m for m in menu_items if m.startswith(raw + " ")]
+    partials = lexicon.prefix_items(raw)
     if len(partials) == 1:
         return partials[0]
     if len(partials) > 1:
-        return {"ambiguous": raw, "options": partials}
+        return {"ambiguous": raw, "options": list(partials)}
 
     # Fuzzy → ambiguity only
-    result = process.extractOne(raw, GENERIC_HEADS, scorer=fuzz.ratio)
-    if result and result[1] >= threshold:
-        head = result[0]
+    if head_match is _NOT_COMPUTED:
+        head_match = lexicon.head_index.best_matches([raw], threshold)[0]
+    if head_match and head_match[1] >= threshold:
+        head = head_match[0]
         return {
             "ambiguous": raw,
-            "options": [m for m in menu_items if m.endswith(head)]
+            "options": list(lexicon.head_options(head))
         }
 
     return None
@@ -88,17 +105,24 @@ def normalize_food_item(raw: str, menu_items: list, threshold: int = 80):
 # -------------------------------
 # MAIN NER POSTPROCESSOR
 # -------------------------------
-def postprocess_ner(doc, menu_items: list) -> Dict[str, Any]:
+def postprocess_ner(doc, menu_items: list, menu_version: str | None = None) -> Dict[str, Any]:
     items = []
     clarifications = []
     last_qty = None
+    lexicon = get_lexicon(menu_items, menu_version)
+
+    # all FOOD_ITEM spans scored against the generic heads in one call
+    foods = [clean_food_text(ent.text) for ent in doc.ents if ent.label_ == "FOOD_ITEM"]
+    head_matches = iter(lexicon.head_index.best_matches(foods, 80))
 
     for ent in doc.ents:
         if ent.label_ == "QUANTITY":
             last_qty = normalize_quantity(ent.text)
 
         elif ent.label_ == "FOOD_ITEM":
-            normalized = normalize_food_item(ent.text, menu_items)
+            normalized = normalize_food_item(
+                ent.text, lexicon, head_match=next(head_matches)
+            )
 
             if isinstance(normalized, dict):
                 clarifications.append({
@@ -1,10 +1,13 @@
 import spacy
 import os
-
-from postprocess import load_menu_items, postprocess_ner, score_ner
+import sys
 
 BASE_DIR = os.path.dirname(__file__)
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+from ner.postprocess import load_menu_items, postprocess_ner, score_ner
+from ner.extract_items import extract_items
 
 # -------------------------------
 # Load spaCy NER model
@@ -47,3 +50,32 @@ for text, intent in tests:
     print("NER payload:")
     print(entities)
     print("NER score:", ner_score)
+
+
+# -------------------------------
+# extract_items (rule-based NER used by the chat pipeline)
+# text -> (food_items, ambiguous word or None)
+# -------------------------------
+extract_tests = [
+    # words of an overlapping menu name are not asked about
+    ("add chocolate brownie with ice cream", (["brownie with ice cream"], None)),
+    ("add vanilla ice cream", (["vanilla ice cream"], None)),
+    ("add veg burger and chocolate brownie", (["chocolate brownie", "veg burger"], None)),
+    ("add two paneer tikka pizza", (["paneer tikka pizza"], None)),
+    # a bare word several dishes share asks which one instead of guessing
+    ("add ice cream", ([], "ice cream")),
+    ("add milkshake", ([], "milkshake")),
+    ("add chocolate", ([], "chocolate")),
+    ("veg", ([], "veg")),
+    ("remove paneer", ([], "paneer")),
+]
+
+failures = 0
+for text, (expected_items, expected_ambiguous) in extract_tests:
+    result = extract_items(text, menu_items)
+    ambiguous = result["clarification"][0]["ambiguous"] if result["clarification"] else None
+    ok = result["food_items"] == expected_items and ambiguous == expected_ambiguous
+    failures += not ok
+    print(("✅" if ok else "❌"), text, "->", result["food_items"], ambiguous)
+
+assert failures == 0, f"{failures} extract_items case(s) failed"
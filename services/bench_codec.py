@@ -0,0 +1,93 @@
+"""
+REDIS_CODEC on the blobs it applies to (LLM response cache and
+idempotency entries): encode/decode throughput, encoded size and, when a
+Redis server is reachable and supports MEMORY USAGE, bytes per key.
+Run from the repo root:
+    python -m services.bench_codec
+"""
+import json
+import time
+import uuid
+
+from services.codec import CODECS, get_codec
+
+ROUNDS = 20000
+
+
+def sample_llm_entry(lines: int = 3) -> dict:
+    # parse_llm_output() shape
+    return {
+        "action": "ADD_ITEM",
+        "items": [{"name": f"Paneer Butter Masala {i}", "quantity": 2} for i in range(1, lines + 1)],
+        "message": "Added those to your cart. Anything else?",
+    }
+
+
+def sample_idempotency_entry(lines: int = 6) -> dict:
+    # services/idempotency.py "done" entry around a cart response
+    body = {
+        "session_id": str(uuid.uuid4()),
+        "cart": [
+            {"item_id": str(i), "name": f"Paneer Butter Masala {i}", "price": 220 + i, "quantity": 2}
+            for i in range(1, lines + 1)
+        ],
+    }
+    return {
+        "state": "done",
+        "fingerprint": uuid.uuid4().hex,
+        "status": 200,
+        "media_type": "application/json",
+        "body": json.dumps(body),
+    }
+
+
+def available_codecs() -> list:
+    codecs = []
+    for name in CODECS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            print(f"{name}: not installed, skipped")
+    return codecs
+
+
+def per_op_us(fn, value) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(value)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def memory_usage(payload: bytes):
+    try:
+        from services.redis_store import rb
+        key = f"bench:codec:{uuid.uuid4()}"
+        rb.set(key, payload, ex=60)
+        try:
+            return rb.memory_usage(key)
+        finally:
+            rb.delete(key)
+    except Exception:
+        return None
+
+
+def main():
+    payloads = {"llm": sample_llm_entry(), "idem": sample_idempotency_entry()}
+    codecs = available_codecs()
+
+    print(f"{'payload':>8} {'codec':>8} {'enc µs':>7} {'dec µs':>7} {'bytes':>6} {'redis B':>8}")
+    for label, value in payloads.items():
+        for codec in codecs:
+            data = codec.encode(value)
+            assert codec.decode(data) == value
+            mem = memory_usage(data)
+            print(
+                f"{label:>8} {codec.name:>8}"
+                f" {per_op_us(codec.encode, value):>7.2f}"
+                f" {per_op_us(codec.decode, data):>7.2f}"
+                f" {len(data):>6} {mem if mem is not None else 'n/a':>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
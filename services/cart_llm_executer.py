@@ -1,7 +1,6 @@
-from services.redis_store import get_json, set_json
-from services.menu_service import get_menu
+from services.menu_service import get_menu_snapshot
+from services.cart_service import MAX_QTY, apply_cart_deltas_async
 
-MAX_QTY = 10
 
 def normalize_item_name(name: str) -> str:
     name = name.lower().strip()
@@ -11,48 +10,37 @@ def normalize_item_name(name: str) -> str:
     return name
 
 
-def apply_llm_cart_decision(session_id: str, llm_out: dict):
-    cart = get_json(f"cart:{session_id}") or []
-    menu = get_menu()
-
-    menu_by_name = {
-        item["name"].lower(): item
-        for item in menu
-    }
+def decision_to_deltas(llm_out: dict) -> dict:
+    """
+    LLM cart decision -> {item_id: +qty | -qty} for cart_service.
+    Unknown names are skipped; repeated items add up.
+    """
+    menu = get_menu_snapshot()
 
     action = llm_out.get("action")
-    items = llm_out.get("items", [])
-
-    for i in items:
+    if action == "ADD_ITEM":
+        sign = 1
+    elif action == "REMOVE_ITEM":
+        sign = -1
+    else:
+        return {}
+
+    deltas = {}
+    for i in llm_out.get("items", []):
         raw_name = i.get("name", "")
         name = normalize_item_name(raw_name)
         qty = max(1, min(i.get("quantity", 1), MAX_QTY))
 
-        if name not in menu_by_name:
+        menu_item = menu.by_name.get(name)
+        if menu_item is None:
             continue
 
-        menu_item = menu_by_name[name]
-
-        if action == "ADD_ITEM":
-            for c in cart:
-                if c["item_id"] == menu_item["id"]:
-                    c["quantity"] += qty
-                    break
-            else:
-                cart.append({
-                    "item_id": menu_item["id"],
-                    "name": menu_item["name"],
-                    "price": menu_item["price"],
-                    "quantity": qty,
-                })
-
-        elif action == "REMOVE_ITEM":
-            for idx, c in enumerate(cart):
-                if c["item_id"] == menu_item["id"]:
-                    c["quantity"] -= qty
-                    if c["quantity"] <= 0:
-                        cart.pop(idx)
-                    break
-
-    set_json(f"cart:{session_id}", cart, ttl=3600)
+        item_id = menu_item["id"]
+        deltas[item_id] = deltas.get(item_id, 0) + sign * qty
+
+    return deltas
+
+
+async def apply_llm_cart_decision_async(session_id: str, llm_out: dict):
+    _, cart, _ = await apply_cart_deltas_async(session_id, decision_to_deltas(llm_out))
     return cart
@@ -1,18 +1,253 @@
-from services.redis_store import get_cart, save_cart
+"""
+Carts as Redis hashes: cart:{<session_id>} = {item_id: quantity}.
 
-def apply_cart_action(session_id, action, items):
-    cart = get_cart(session_id)
+Names and prices come from the menu catalog when the cart is read, so
+only quantities live in Redis. Every mutation is one Lua call that
+checks the session is ORDERING, applies HINCRBY per item, clamps to
+MAX_QTY, drops items at zero and returns the resulting cart: atomic, one
+round trip, no lost updates between concurrent writers on the same table.
 
-    if action == "ADD_ITEM":
-        for item in items:
-            cart[item.name] = cart.get(item.name, 0) + item.quantity
+apply_cart_ops_async() runs a list of add / remove / set operations the same
+way, in order, in one script, and reports what each one did.
 
-    elif action == "REMOVE_ITEM":
-        for item in items:
-            if item.name in cart:
-                cart[item.name] -= item.quantity
-                if cart[item.name] <= 0:
-                    del cart[item.name]
+Carts (and sessions) written by older builds as JSON are converted in
+place the first time a script touches them (services/redis_lua.py).
+Reads go through the worker's near cache when it is enabled.
+"""
+from services.keys import cart_key, session_key
+from services.menu_service import get_menu_snapshot
+from services.near_cache import near_cache
+from services.redis_lua import LOAD_CART, LOAD_SESSION, CHANGED
+from services.redis_store import ar
 
-    save_cart(session_id, cart)
-    return cart
+MAX_QTY = 10
+CART_TTL = 3600
+CART_OPS = ("add", "remove", "set")
+MAX_CART_OPS = 50
+
+# KEYS: cart, session
+# returns {flat session, flat cart}
+_READ = LOAD_CART + LOAD_SESSION + """
+load_session(KEYS[2])
+load_cart(KEYS[1])
+return {redis.call('HGETALL', KEYS[2]), redis.call('HGETALL', KEYS[1])}
+"""
+
+# KEYS: cart, session   ARGV: ttl, max_qty, item_id, delta, item_id, delta, ...
+# returns {status, flat cart, number of removals for items not in the cart}
+_APPLY = LOAD_CART + LOAD_SESSION + CHANGED + """
+load_session(KEYS[2])
+local status = redis.call('HGET', KEYS[2], 'status')
+if not status then
+  return {'NO_SESSION', {}, 0}
+end
+load_cart(KEYS[1])
+if status ~= 'ORDERING' then
+  return {'NOT_ORDERING', redis.call('HGETALL', KEYS[1]), 0}
+end
+
+local max_qty = tonumber(ARGV[2])
+local missing = 0
+for i = 3, #ARGV, 2 do
+  local id = ARGV[i]
+  local delta = tonumber(ARGV[i + 1])
+  if delta < 0 and redis.call('HEXISTS', KEYS[1], id) == 0 then
+    missing = missing + 1
+  else
+    local qty = redis.call('HINCRBY', KEYS[1], id, delta)
+    if qty > max_qty then
+      redis.call('HSET', KEYS[1], id, max_qty)
+    elseif qty <= 0 then
+      redis.call('HDEL', KEYS[1], id)
+    end
+  end
+end
+
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+changed(KEYS[1])
+return {'OK', redis.call('HGETALL', KEYS[1]), missing}
+"""
+
+# KEYS: cart, session   ARGV: ttl, max_qty, op, item_id, qty, op, item_id, qty, ...
+# returns {status, flat cart, {result, quantity} per op}
+_OPS = LOAD_CART + LOAD_SESSION + CHANGED + """
+load_session(KEYS[2])
+local status = redis.call('HGET', KEYS[2], 'status')
+if not status then
+  return {'NO_SESSION', {}, {}}
+end
+load_cart(KEYS[1])
+if status ~= 'ORDERING' then
+  return {'NOT_ORDERING', redis.call('HGETALL', KEYS[1]), {}}
+end
+
+local max_qty = tonumber(ARGV[2])
+local results = {}
+for i = 3, #ARGV, 3 do
+  local op, id, n = ARGV[i], ARGV[i + 1], tonumber(ARGV[i + 2])
+  local current = tonumber(redis.call('HGET', KEYS[1], id) or '0')
+  local result, qty = 'OK', current
+  if op == 'add' then
+    qty = current + n
+  elseif op == 'remove' then
+    if current == 0 then
+      result = 'NOT_IN_CART'
+    else
+      qty = current - n
+    end
+  else
+    qty = n
+  end
+  if qty > max_qty then
+    qty = max_qty
+    result = 'CLAMPED'
+  elseif qty < 0 then
+    qty = 0
+  end
+  if qty ~= current then
+    if qty == 0 then
+      redis.call('HDEL', KEYS[1], id)
+    else
+      redis.call('HSET', KEYS[1], id, qty)
+    end
+  end
+  results[#results + 1] = {result, qty}
+end
+
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+changed(KEYS[1])
+return {'OK', redis.call('HGETALL', KEYS[1]), results}
+"""
+
+_read_script_async = ar.register_script(_READ)
+_apply_script_async = ar.register_script(_APPLY)
+_ops_script_async = ar.register_script(_OPS)
+
+
+def _keys(session_id: str) -> list[str]:
+    return [cart_key(session_id), session_key(session_id)]
+
+
+def _deltas_args(deltas: dict) -> list:
+    args = [CART_TTL, MAX_QTY]
+    for item_id, delta in deltas.items():
+        args += [item_id, int(delta)]
+    return args
+
+
+def _ops_args(ops: list) -> list:
+    args = [CART_TTL, MAX_QTY]
+    for op, item_id, qty in ops:
+        args += [op, item_id, int(qty)]
+    return args
+
+
+def _parse_ops(ops: list, reply):
+    status, flat, results = reply
+    results = [
+        {"op": op, "item_id": item_id, "result": result, "quantity": int(qty)}
+        for (op, item_id, _), (result, qty) in zip(ops, results)
+    ]
+    return status, cart_items(flat), results
+
+
+def priced_items(lines) -> list:
+    """
+    (item_id, quantity) pairs -> [{item_id, name, price, quantity}] in
+    menu order, priced from the catalog. Items no longer on the menu
+    are left out.
+    """
+    menu = get_menu_snapshot()
+    items = []
+    for item_id, qty in lines:
+        menu_item = menu.item_by_id(item_id)
+        if menu_item is None:
+            continue
+        items.append({
+            "item_id": item_id,
+            "name": menu_item["name"],
+            "price": menu_item["price"],
+            "quantity": int(qty),
+        })
+    items.sort(key=lambda c: menu.position[c["item_id"]])
+    return items
+
+
+def cart_items(flat: list) -> list:
+    """
+    HGETALL reply -> priced cart items.
+    """
+    return priced_items(zip(flat[::2], flat[1::2]))
+
+
+def hash_to_dict(flat: list) -> dict | None:
+    return dict(zip(flat[::2], flat[1::2])) if flat else None
+
+
+def cart_total(cart: list) -> int:
+    return sum(c["price"] * c["quantity"] for c in cart)
+
+
+def _parse_read(reply):
+    session, flat = reply
+    return hash_to_dict(session), cart_items(flat)
+
+
+def _cached_read(keys: list[str]):
+    cached = near_cache.lookup(keys)
+    if cached is None:
+        return None
+    flat, session = cached
+    return hash_to_dict(session), cart_items(flat)
+
+
+def _fill_read(fill: dict, keys: list[str], reply):
+    session, flat = reply
+    if session:
+        fill[keys[0]] = tuple(flat)
+        fill[keys[1]] = tuple(session)
+
+
+async def get_session_and_cart_async(session_id: str):
+    """
+    (session | None, cart items) in one round trip, or none on a near
+    cache hit.
+    """
+    keys = _keys(session_id)
+    cached = _cached_read(keys)
+    if cached is not None:
+        return cached
+
+    with near_cache.loading(keys) as fill:
+        reply = await _read_script_async(keys=keys)
+        _fill_read(fill, keys, reply)
+    return _parse_read(reply)
+
+
+async def apply_cart_deltas_async(session_id: str, deltas: dict):
+    """
+    deltas: {item_id: +n | -n}. Returns (status, cart items, missing):
+    status is OK, NO_SESSION or NOT_ORDERING; missing counts removals of
+    items that were not in the cart.
+    """
+    keys = _keys(session_id)
+    status, flat, missing = await _apply_script_async(keys=keys, args=_deltas_args(deltas))
+    near_cache.invalidate(keys[:1])
+    return status, cart_items(flat), missing
+
+
+async def apply_cart_ops_async(session_id: str, ops: list):
+    """
+    ops: [(op, item_id, qty)] with op in CART_OPS, applied in order in
+    one script. Returns (status, cart items, results): one
+    {op, item_id, result, quantity} per op, result OK, CLAMPED (capped at
+    MAX_QTY) or NOT_IN_CART (remove of an item not in the cart).
+    """
+    keys = _keys(session_id)
+    reply = await _ops_script_async(keys=keys, args=_ops_args(ops))
+    near_cache.invalidate(keys[:1])
+    return _parse_ops(ops, reply)
@@ -0,0 +1,258 @@
+import asyncio
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from classifier.intent_minilm import predict_intent_with_embedding
+from classifier.intent_batcher import intent_batcher, INTENT_BATCH_ENABLED
+from classifier.intent_cascade import first_stage, INTENT_MODE
+from ner.extract_items import extract_items
+from llm.ollama_router import (
+    run_llm_response_async,
+    stream_llm_tokens_async,
+    parse_llm_output,
+    LLM_FALLBACK,
+)
+from llm.response_cache import cache_key, get_cached, put_cached
+from llm.semantic_cache import semantic_cache, SEMANTIC_CACHE_ENABLED
+from services.cart_llm_executer import apply_llm_cart_decision_async
+from services.fast_path import try_fast_path
+from services.menu_service import get_menu_snapshot
+
+# -------------------------------
+# CPU-bound stages run here, never on the event loop
+# -------------------------------
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+
+_inference_pool = ThreadPoolExecutor(
+    max_workers=INFERENCE_WORKERS,
+    thread_name_prefix="inference",
+)
+
+
+async def run_in_inference_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_inference_pool, fn, *args)
+
+
+# -------------------------------
+# Signals (intent + NER)
+# -------------------------------
+async def predict_intent_stage(text: str):
+    """
+    Returns (intent_out, embedding); embedding is None when the
+    TF-IDF stage of the cascade answered.
+    """
+    if INTENT_MODE == "cascade":
+        accepted = await run_in_inference_pool(first_stage, text)
+        if accepted is not None:
+            return accepted, None
+
+    if INTENT_BATCH_ENABLED:
+        return await intent_batcher.predict_async(text)
+    return await run_in_inference_pool(predict_intent_with_embedding, text)
+
+
+async def detect_signals(text: str):
+    """
+    Run intent detection and menu NER at the same time.
+    Returns ((intent_out, embedding), ner_result).
+    """
+    menu = get_menu_snapshot()
+    return await asyncio.gather(
+        predict_intent_stage(text),
+        run_in_inference_pool(extract_items, text, menu.names, menu.version),
+    )
+
+
+def ner_confidence(ner_result: dict) -> float:
+    if ner_result.get("food_items"):
+        return 1.0
+    if ner_result.get("clarification"):
+        return 0.6
+    return 0.3
+
+
+def decide_flow(ner_result: dict) -> str:
+    if ner_result.get("food_items") and not ner_result.get("clarification"):
+        return "EXECUTE"
+    if ner_result.get("clarification"):
+        return "CLARIFICATION"
+    return "EXECUTE"
+
+
+# -------------------------------
+# Path stats (which turns skipped the LLM)
+# -------------------------------
+PATH_STATS: Counter = Counter()
+
+
+def path_stats() -> dict:
+    total = sum(PATH_STATS.values())
+    return {
+        "turns": total,
+        "paths": dict(PATH_STATS),
+        "llm_share": round(PATH_STATS["llm"] / total, 3) if total else None,
+    }
+
+
+# -------------------------------
+# Turn helpers
+# -------------------------------
+async def prepare_turn(text: str) -> dict:
+    """
+    Steps 1️⃣-3️⃣: intent, NER and flow for one message.
+    """
+    (intent_out, embedding), ner_result = await detect_signals(text)
+    return {
+        "embedding": embedding,
+        "intent": intent_out["intent"],
+        "intent_confidence": intent_out["confidence"],
+        "ner": ner_result,
+        "ner_confidence": ner_confidence(ner_result),
+        "flow": decide_flow(ner_result),
+    }
+
+
+def llm_kwargs(text: str, signals: dict) -> dict:
+    return dict(
+        user_text=text,
+        intent=signals["intent"],
+        intent_conf=signals["intent_confidence"],
+        ner_result=signals["ner"],
+        ner_conf=signals["ner_confidence"],
+        flow=signals["flow"],
+        menu_items=get_menu_snapshot().prompt_names,
+    )
+
+
+def response_cache_key(text: str, signals: dict) -> str:
+    return cache_key(signals["flow"], signals["intent"], signals["ner"], text)
+
+
+async def lookup_llm_out(key: str, signals: dict):
+    """
+    Exact cache first, then nearest previous message. Returns (llm_out, path).
+    """
+    llm_out = await get_cached(key)
+    if llm_out is not None:
+        return llm_out, "cache"
+
+    if SEMANTIC_CACHE_ENABLED and signals["embedding"] is not None:
+        llm_out = semantic_cache.lookup(signals["embedding"], signals["intent"], signals["ner"])
+        if llm_out is not None:
+            return llm_out, "semantic_cache"
+
+    return None, "llm"
+
+
+async def remember_llm_out(key: str, signals: dict, llm_out: dict):
+    # never pin a parse failure in the cache
+    if llm_out == LLM_FALLBACK:
+        return
+
+    await put_cached(key, llm_out)
+    if SEMANTIC_CACHE_ENABLED and signals["embedding"] is not None:
+        semantic_cache.add(signals["embedding"], signals["intent"], signals["ner"], llm_out)
+
+
+async def apply_cart_mutation(session_id: str, session: dict, signals: dict, llm_out: dict):
+    """
+    Backend cart mutation for LLM decisions. Returns the cart or None.
+    """
+    if (
+        signals["intent"] in ("ADD_ITEM", "REMOVE_ITEM")
+        and llm_out.get("action") in ("ADD_ITEM", "REMOVE_ITEM")
+        and session["status"] == "ORDERING"
+    ):
+        return await apply_llm_cart_decision_async(session_id, llm_out)
+    return None
+
+
+def build_response(signals: dict, llm_out: dict, cart, path: str, session_status=None) -> dict:
+    PATH_STATS[path] += 1
+
+    response = {
+        "intent": signals["intent"],
+        "intent_confidence": signals["intent_confidence"],
+        "ner": signals["ner"],
+        "ner_confidence": signals["ner_confidence"],
+        "llm": llm_out,
+        "path": path,
+    }
+
+    if cart is not None:
+        response["cart"] = cart
+
+    if session_status:
+        response["session_status"] = session_status
+
+    return response
+
+
+# -------------------------------
+# One chat turn
+# -------------------------------
+async def run_chat_turn(session_id: str, session: dict, text: str, cart: list) -> dict:
+    """
+    session and cart are read by the caller in one round trip.
+    """
+    signals = await prepare_turn(text)
+
+    # 4️⃣ Deterministic fast path for high-confidence turns
+    fast = await try_fast_path(session_id, session, cart, signals)
+    if fast is not None:
+        return build_response(
+            signals, fast["llm"], fast["cart"], "fast", fast.get("session_status")
+        )
+
+    # 5️⃣ Cached answer for an equal or near-identical turn, else the LLM
+    key = response_cache_key(text, signals)
+    llm_out, path = await lookup_llm_out(key, signals)
+
+    if llm_out is None:
+        llm_out = await run_llm_response_async(**llm_kwargs(text, signals))
+        await remember_llm_out(key, signals, llm_out)
+
+    cart = await apply_cart_mutation(session_id, session, signals, llm_out)
+
+    # 6️⃣ Build response LAST
+    return build_response(signals, llm_out, cart, path)
+
+
+async def stream_chat_turn(session_id: str, session: dict, text: str, cart: list):
+    """
+    Same turn as run_chat_turn, as (event, data) pairs:
+    signals -> token* -> cart? -> final
+    """
+    signals = await prepare_turn(text)
+    yield "signals", {
+        k: signals[k] for k in ("intent", "intent_confidence", "ner", "ner_confidence")
+    }
+
+    fast = await try_fast_path(session_id, session, cart, signals)
+    if fast is not None:
+        if fast["cart"] is not None:
+            yield "cart", {"items": fast["cart"]}
+        yield "final", build_response(
+            signals, fast["llm"], fast["cart"], "fast", fast.get("session_status")
+        )
+        return
+
+    key = response_cache_key(text, signals)
+    llm_out, path = await lookup_llm_out(key, signals)
+
+    if llm_out is None:
+        tokens = []
+        async for token in stream_llm_tokens_async(**llm_kwargs(text, signals)):
+            tokens.append(token)
+            yield "token", {"text": token}
+
+        llm_out = parse_llm_output("".join(tokens).strip())
+        await remember_llm_out(key, signals, llm_out)
+
+    cart = await apply_cart_mutation(session_id, session, signals, llm_out)
+    if cart is not None:
+        yield "cart", {"items": cart}
+
+    yield "final", build_response(signals, llm_out, cart, path)
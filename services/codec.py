@@ -0,0 +1,85 @@
+"""
+Value codec for the LLM response cache and idempotency entries, the
+blobs that only Python reads and writes. Orders stay JSON (Lua writes
+them with cjson) and go through the plain helpers in redis_store.
+
+REDIS_CODEC picks how these values are encoded:
+    json     stdlib json (text, same bytes as before)
+    orjson   orjson (JSON too, several times faster)
+    msgpack  MessagePack behind a 0xC1 marker byte
+0xC1 is never emitted by msgpack and never starts JSON, so decode() can
+tell the formats apart: anything without the marker is read as JSON,
+which covers entries written before REDIS_CODEC changed.
+orjson and msgpack are imported only when selected.
+"""
+import json
+import os
+
+REDIS_CODEC = os.getenv("REDIS_CODEC", "json")
+
+MSGPACK_MARKER = b"\xc1"
+
+
+class Codec:
+    name = "json"
+
+    def encode(self, value) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    def decode_json(self, data):
+        return json.loads(data)
+
+    def decode(self, data):
+        """
+        bytes/str from Redis -> value; None stays None.
+        """
+        if not data:
+            return None
+        if isinstance(data, bytes) and data[:1] == MSGPACK_MARKER:
+            return _msgpack().unpackb(data[1:])
+        return self.decode_json(data)
+
+
+class OrjsonCodec(Codec):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def encode(self, value) -> bytes:
+        return self._orjson.dumps(value)
+
+    def decode_json(self, data):
+        return self._orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+
+    def __init__(self):
+        self._msgpack = _msgpack()
+
+    def encode(self, value) -> bytes:
+        return MSGPACK_MARKER + self._msgpack.packb(value)
+
+
+def _msgpack():
+    import msgpack
+    return msgpack
+
+
+CODECS = {
+    "json": Codec,
+    "orjson": OrjsonCodec,
+    "msgpack": MsgpackCodec,
+}
+
+
+def get_codec(name: str) -> Codec:
+    if name not in CODECS:
+        raise ValueError(f"Unknown REDIS_CODEC {name!r}; expected one of {sorted(CODECS)}")
+    return CODECS[name]()
+
+
+codec = get_codec(REDIS_CODEC)
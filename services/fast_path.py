@@ -0,0 +1,143 @@
+"""
+Deterministic replies for high-confidence turns.
+
+Sits between NER and the LLM: when intent confidence clears a tunable
+threshold and NER is unambiguous (item changes: one item, found by the
+exact matcher, not a fuzzy guess), the action/items/message dict is built
+from templates (or a backend handler) and Ollama is never called.
+"""
+import os
+
+from services.menu_service import get_menu_snapshot
+from services.cart_service import MAX_QTY, apply_cart_ops_async, cart_total
+from services.session_service import confirm_cart_async
+
+# -------------------------------
+# Config (env tunable)
+# -------------------------------
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+FAST_PATH_ITEM_CONF = float(os.getenv("FAST_PATH_ITEM_CONF", "0.9"))
+FAST_PATH_CART_CONF = float(os.getenv("FAST_PATH_CART_CONF", "0.85"))
+
+TEMPLATES = {
+    "ADD_ITEM": "Added {items} to your cart.",
+    "ADD_CLAMPED": "{name} is limited to {max_qty} per order; you have {quantity} in your cart.",
+    "REMOVE_ITEM": "Removed {items} from your cart; {quantity} left.",
+    "REMOVE_ALL": "Removed {name} from your cart.",
+    "NOT_IN_CART": "{name} is not in your cart.",
+    "SHOW_CART": "Your cart: {items}. Total: ₹{total}.",
+    "CART_EMPTY": "Your cart is empty. What would you like to order?",
+    "CONFIRMED": "Cart confirmed ✅ You can place the order now.",
+    "NOT_ORDERING": "Your cart is already confirmed.",
+}
+
+
+def _format_items(items: list) -> str:
+    return ", ".join(f"{i['quantity']} x {i['name']}" for i in items)
+
+
+def _reply(action: str, items: list, message: str) -> dict:
+    return {"action": action, "items": items, "message": message}
+
+
+# -------------------------------
+# Rules
+# -------------------------------
+async def _fast_item_change(session_id: str, session: dict, cart: list, signals: dict):
+    ner = signals["ner"]
+    # NER has one quantity per message, so multi-item turns go to the LLM
+    if (
+        signals["intent_confidence"] < FAST_PATH_ITEM_CONF
+        or len(ner.get("food_items") or []) != 1
+        or ner.get("match") != "exact"
+        or ner.get("clarification")
+        or session["status"] != "ORDERING"
+    ):
+        return None
+
+    menu_item = get_menu_snapshot().by_name.get(ner["food_items"][0])
+    if menu_item is None:
+        return None
+    qty = max(1, min(ner.get("quantity") or 1, MAX_QTY))
+    items = [{"name": menu_item["name"], "quantity": qty}]
+
+    # the reply describes what the script did, not what was asked for
+    intent = signals["intent"]
+    op = "add" if intent == "ADD_ITEM" else "remove"
+    status, cart, results = await apply_cart_ops_async(session_id, [(op, menu_item["id"], qty)])
+    if status == "NOT_ORDERING":
+        return {"llm": _reply("NONE", [], TEMPLATES["NOT_ORDERING"]), "cart": None}
+    if status != "OK":
+        return None
+
+    result, now = results[0]["result"], results[0]["quantity"]
+    fields = dict(items=_format_items(items), name=menu_item["name"], quantity=now, max_qty=MAX_QTY)
+    if result == "NOT_IN_CART":
+        return {"llm": _reply("NONE", [], TEMPLATES["NOT_IN_CART"].format(**fields)), "cart": cart}
+    if result == "CLAMPED":
+        template = "ADD_CLAMPED"
+    elif op == "remove" and now == 0:
+        template = "REMOVE_ALL"
+    else:
+        template = intent
+    return {"llm": _reply(intent, items, TEMPLATES[template].format(**fields)), "cart": cart}
+
+
+async def _fast_show_cart(session_id: str, session: dict, cart: list, signals: dict):
+    if signals["intent_confidence"] < FAST_PATH_CART_CONF:
+        return None
+
+    if not cart:
+        message = TEMPLATES["CART_EMPTY"]
+    else:
+        message = TEMPLATES["SHOW_CART"].format(
+            items=_format_items(cart), total=cart_total(cart)
+        )
+    return {"llm": _reply("NONE", [], message), "cart": cart}
+
+
+async def _fast_confirm(session_id: str, session: dict, cart: list, signals: dict):
+    if signals["intent_confidence"] < FAST_PATH_CART_CONF:
+        return None
+
+    if session["status"] != "ORDERING":
+        return {"llm": _reply("NONE", [], TEMPLATES["NOT_ORDERING"]), "cart": None}
+
+    if not cart:
+        return {"llm": _reply("NONE", [], TEMPLATES["CART_EMPTY"]), "cart": cart}
+
+    result, _, cart = await confirm_cart_async(session_id)
+    if result == "EMPTY_CART":
+        return {"llm": _reply("NONE", [], TEMPLATES["CART_EMPTY"]), "cart": cart}
+    if result != "OK":
+        return {"llm": _reply("NONE", [], TEMPLATES["NOT_ORDERING"]), "cart": None}
+
+    return {
+        "llm": _reply("NONE", [], TEMPLATES["CONFIRMED"]),
+        "cart": cart,
+        "session_status": "CONFIRMED",
+    }
+
+
+FAST_RULES = {
+    "ADD_ITEM": _fast_item_change,
+    "REMOVE_ITEM": _fast_item_change,
+    "SHOW_CART": _fast_show_cart,
+    "CONFIRM_ORDER": _fast_confirm,
+}
+
+
+async def try_fast_path(session_id: str, session: dict, cart: list, signals: dict) -> dict | None:
+    """
+    cart: the session's cart, read together with the session.
+    Returns {"llm": ..., "cart": ..., ["session_status": ...]} when the turn
+    can be answered without the LLM, else None.
+    """
+    if not FAST_PATH_ENABLED:
+        return None
+
+    rule = FAST_RULES.get(signals["intent"])
+    if rule is None:
+        return None
+
+    return await rule(session_id, session, cart, signals)
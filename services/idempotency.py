@@ -0,0 +1,187 @@
+"""
+Idempotency-Key support for the mutating endpoints.
+
+A POST to one of IDEMPOTENT_PATHS with an Idempotency-Key header claims
+idem:<path>:<key> with SET NX GET (Redis >= 7; a pending marker that expires after
+IDEMPOTENCY_PENDING_TTL). The request that got it runs normally and its
+response replaces the marker for IDEMPOTENCY_TTL; repeats get that
+stored response (Idempotent-Replayed: true) and nothing runs again, no
+cart write and no LLM call.
+
+A repeat that arrives while the first request is still running waits
+for its response (polling with backoff, up to IDEMPOTENCY_WAIT seconds,
+then 409) instead of running in parallel. Reusing a key for a different
+request is a 422. 5xx responses are not stored, so those can be retried.
+
+Event streams (/agent/chat/stream) are passed through as they are
+produced and stored once their last frame is STREAM_FINAL_EVENT; a
+repeat gets every frame at once. A stream that stops before that (client
+gone, error half way) leaves an "aborted" entry for
+IDEMPOTENCY_PENDING_TTL: repeats get 409 rather than a second LLM turn
+and cart change.
+"""
+import asyncio
+import hashlib
+import os
+import time
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from services.codec import codec
+from services.redis_store import arb
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "3600"))
+IDEMPOTENCY_PENDING_TTL = int(os.getenv("IDEMPOTENCY_PENDING_TTL", "120"))
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "60"))
+IDEMPOTENCY_KEY_MAX_LEN = 255
+# every complete chat stream ends with this frame (see stream_chat_turn)
+STREAM_FINAL_EVENT = b"event: final\n"
+
+IDEMPOTENT_PATHS = {
+    "/cart/add",
+    "/cart/remove",
+    "/cart/batch",
+    "/cart/confirm",
+    "/order/place",
+    "/agent/chat",
+    "/agent/chat/stream",
+}
+
+_stats = {"stored": 0, "replayed": 0, "waited": 0, "mismatched": 0, "aborted": 0}
+# cleanup writes scheduled while a stream is being cancelled
+_cleanup_tasks: set[asyncio.Task] = set()
+
+
+def _fingerprint(request: Request, body: bytes) -> str:
+    h = hashlib.sha1()
+    for part in (request.method, request.url.path, request.url.query):
+        h.update(part.encode("utf-8") + b"\0")
+    h.update(body)
+    return h.hexdigest()
+
+
+def _replay(entry: dict) -> Response:
+    return Response(
+        content=entry["body"],
+        status_code=entry["status"],
+        media_type=entry["media_type"],
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+async def _store(key: str, fingerprint: str, status: int, media_type: str | None, body: bytes):
+    entry = {
+        "state": "done",
+        "fingerprint": fingerprint,
+        "status": status,
+        "media_type": media_type,
+        "body": body.decode("utf-8"),
+    }
+    await arb.set(key, codec.encode(entry), ex=IDEMPOTENCY_TTL)
+    _stats["stored"] += 1
+
+
+def _abort(key: str, fingerprint: str):
+    # may run mid-cancellation: write from a separate task
+    _stats["aborted"] += 1
+    aborted = codec.encode({"state": "aborted", "fingerprint": fingerprint})
+    task = asyncio.create_task(arb.set(key, aborted, ex=IDEMPOTENCY_PENDING_TTL))
+    _cleanup_tasks.add(task)
+    task.add_done_callback(_cleanup_tasks.discard)
+
+
+def _tee_stream(key: str, fingerprint: str, response: Response, media_type: str) -> Response:
+    async def tee():
+        chunks = []
+        try:
+            async for chunk in response.body_iterator:
+                chunks.append(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+                yield chunk
+        except BaseException:
+            _abort(key, fingerprint)
+            raise
+
+        body = b"".join(chunks)
+        # an endpoint error ends the body early without raising here
+        last_frame = body.rstrip(b"\n").rpartition(b"\n\n")[2]
+        if last_frame.startswith(STREAM_FINAL_EVENT):
+            await _store(key, fingerprint, response.status_code, media_type, body)
+        else:
+            _abort(key, fingerprint)
+
+    return StreamingResponse(tee(), status_code=response.status_code, headers=dict(response.headers))
+
+
+async def _run_first(key: str, fingerprint: str, request: Request, call_next) -> Response:
+    try:
+        response = await call_next(request)
+    except BaseException:
+        await arb.delete(key)
+        raise
+
+    if response.status_code >= 500:
+        await arb.delete(key)
+        return response
+
+    media_type = response.media_type or response.headers.get("content-type")
+    if media_type and media_type.startswith("text/event-stream"):
+        return _tee_stream(key, fingerprint, response, media_type)
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    await _store(key, fingerprint, response.status_code, media_type, body)
+
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+async def idempotent_requests(request: Request, call_next):
+    key = request.headers.get("idempotency-key")
+    if not key or request.method != "POST" or request.url.path not in IDEMPOTENT_PATHS:
+        return await call_next(request)
+    if len(key) > IDEMPOTENCY_KEY_MAX_LEN:
+        return JSONResponse({"detail": "Idempotency-Key is too long"}, status_code=400)
+
+    fingerprint = _fingerprint(request, await request.body())
+    redis_key = f"idem:{request.url.path}:{key}"
+    pending = codec.encode({"state": "pending", "fingerprint": fingerprint})
+
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT
+    delay = 0.05
+    waited = False
+    while True:
+        # claim and read in one round trip: None means the claim succeeded
+        current = await arb.set(redis_key, pending, nx=True, ex=IDEMPOTENCY_PENDING_TTL, get=True)
+        if current is None:
+            return await _run_first(redis_key, fingerprint, request, call_next)
+
+        entry = codec.decode(current)
+        if entry["fingerprint"] != fingerprint:
+            _stats["mismatched"] += 1
+            return JSONResponse(
+                {"detail": "Idempotency-Key was already used for a different request"},
+                status_code=422,
+            )
+        if entry["state"] == "done":
+            _stats["replayed"] += 1
+            return _replay(entry)
+        if entry["state"] == "aborted":
+            return JSONResponse(
+                {"detail": "The request with this Idempotency-Key was interrupted"},
+                status_code=409,
+            )
+
+        if not waited:
+            waited = True
+            _stats["waited"] += 1
+        if time.monotonic() >= deadline:
+            return JSONResponse(
+                {"detail": "A request with this Idempotency-Key is still in progress"},
+                status_code=409,
+            )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+def idempotency_stats() -> dict:
+    return dict(_stats)
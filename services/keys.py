@@ -0,0 +1,35 @@
+"""
+Redis key names.
+
+Everything that belongs to one session carries the {session_id} hash
+tag, so session, cart and orders live in the same Redis Cluster slot and
+one Lua script or MULTI can still touch all of them. Order ids embed the
+session id for the same reason:
+
+    session:{<sid>}             hash {table_id, status[, order_id]}
+    cart:{<sid>}                hash {item_id: quantity}
+    order:{<sid>}:<suffix>      order id "<sid>.<suffix>"
+
+Orders placed before hash tags have plain uuid ids and keep their old
+key order:<id> (see services/migrate_keys.py).
+"""
+import uuid
+
+
+def session_key(session_id: str) -> str:
+    return f"session:{{{session_id}}}"
+
+
+def cart_key(session_id: str) -> str:
+    return f"cart:{{{session_id}}}"
+
+
+def new_order_id(session_id: str) -> str:
+    return f"{session_id}.{uuid.uuid4().hex}"
+
+
+def order_key(order_id: str) -> str:
+    session_id, _, suffix = order_id.rpartition(".")
+    if not session_id:
+        return f"order:{order_id}"
+    return f"order:{{{session_id}}}:{suffix}"
@@ -0,0 +1,154 @@
+"""
+Kitchen order queue on a Redis Stream.
+
+place_order appends every placed order to KITCHEN_STREAM. Kitchen
+stations read it through one consumer group, so each order goes to one
+station and adding stations adds throughput:
+
+- blocking XREADGROUP (KITCHEN_BLOCK_MS), no polling
+- one XACK per delivered batch
+- on start a station first re-reads its own unacknowledged entries; every
+  KITCHEN_CLAIM_INTERVAL seconds it takes over entries another station
+  has left pending for KITCHEN_CLAIM_IDLE_MS (XAUTOCLAIM)
+
+Status changes (PREPARING, READY) go through session_service and are
+pushed to the order status streams.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+from redis.exceptions import ResponseError
+
+from services.redis_store import ar
+
+KITCHEN_STREAM = os.getenv("KITCHEN_STREAM", "kitchen:orders")
+KITCHEN_GROUP = os.getenv("KITCHEN_GROUP", "kitchen")
+KITCHEN_STREAM_MAXLEN = int(os.getenv("KITCHEN_STREAM_MAXLEN", "10000"))
+KITCHEN_BATCH_SIZE = int(os.getenv("KITCHEN_BATCH_SIZE", "20"))
+# must stay below REDIS_SOCKET_TIMEOUT
+KITCHEN_BLOCK_MS = int(os.getenv("KITCHEN_BLOCK_MS", "2000"))
+KITCHEN_CLAIM_IDLE_MS = int(os.getenv("KITCHEN_CLAIM_IDLE_MS", "60000"))
+KITCHEN_CLAIM_INTERVAL = float(os.getenv("KITCHEN_CLAIM_INTERVAL", "30"))
+
+_group_ready = False
+
+
+async def ensure_group():
+    global _group_ready
+
+    if _group_ready:
+        return
+    try:
+        await ar.xgroup_create(KITCHEN_STREAM, KITCHEN_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+    _group_ready = True
+
+
+def _tickets(entries) -> tuple[list[dict], list[str]]:
+    """
+    Stream entries -> (orders, entry ids). Entries trimmed from the
+    stream come back without fields; they are only acknowledged.
+    """
+    orders, ids = [], []
+    for entry_id, fields in entries:
+        ids.append(entry_id)
+        if fields:
+            orders.append(json.loads(fields["order"]))
+    return orders, ids
+
+
+class KitchenConsumer:
+    """
+    One station. batches() yields lists of stored orders (possibly empty
+    after a quiet KITCHEN_BLOCK_MS); the previous batch is acknowledged
+    when the next one is requested.
+    """
+
+    def __init__(self, station: str):
+        self.station = station
+        self._backlog = True
+        self._claim_cursor = "0-0"
+        self._next_claim = 0.0
+        self.delivered = 0
+        self.claimed = 0
+
+    async def _claim(self) -> list:
+        start, entries, *_ = await ar.xautoclaim(
+            KITCHEN_STREAM,
+            KITCHEN_GROUP,
+            self.station,
+            min_idle_time=KITCHEN_CLAIM_IDLE_MS,
+            start_id=self._claim_cursor,
+            count=KITCHEN_BATCH_SIZE,
+        )
+        self._claim_cursor = start
+        self.claimed += len(entries)
+        return entries
+
+    async def _read(self) -> list:
+        if self._backlog:
+            # own pending entries from before a restart or disconnect
+            reply = await ar.xreadgroup(
+                KITCHEN_GROUP, self.station, {KITCHEN_STREAM: "0"}, count=KITCHEN_BATCH_SIZE
+            )
+            entries = reply[0][1] if reply else []
+            if entries:
+                return entries
+            self._backlog = False
+
+        if time.monotonic() >= self._next_claim:
+            entries = await self._claim()
+            if self._claim_cursor == "0-0":
+                self._next_claim = time.monotonic() + KITCHEN_CLAIM_INTERVAL
+            if entries:
+                return entries
+
+        reply = await ar.xreadgroup(
+            KITCHEN_GROUP,
+            self.station,
+            {KITCHEN_STREAM: ">"},
+            count=KITCHEN_BATCH_SIZE,
+            block=KITCHEN_BLOCK_MS,
+        )
+        return reply[0][1] if reply else []
+
+    async def batches(self):
+        global _group_ready
+
+        await ensure_group()
+        while True:
+            try:
+                entries = await self._read()
+            except ResponseError as e:
+                if "NOGROUP" not in str(e):
+                    raise
+                # stream or group was deleted
+                _group_ready = False
+                await ensure_group()
+                continue
+            orders, ids = _tickets(entries)
+            yield orders
+            # only reached when the caller asks for more; a batch it never
+            # got through stays pending and is re-read or claimed later
+            if ids:
+                await ar.xack(KITCHEN_STREAM, KITCHEN_GROUP, *ids)
+                self.delivered += len(orders)
+
+
+async def _print_tickets(station: str):
+    from services.session_service import order_view
+
+    async for orders in KitchenConsumer(station).batches():
+        for order in map(order_view, orders):
+            items = ", ".join(f'{i["quantity"]} x {i["name"]}' for i in order["items"])
+            print(f'[{station}] {order["order_id"]} table {order.get("table_id")}: {items}')
+
+
+if __name__ == "__main__":
+    # headless station: python -m services.kitchen <station>
+    asyncio.run(_print_tickets(sys.argv[1] if len(sys.argv) > 1 else "station-1"))
@@ -0,0 +1,85 @@
+"""
+Menu hot reload across worker processes.
+
+A worker that notices a new menu (file watcher or the admin endpoint)
+swaps its own snapshot and publishes the new version on
+MENU_RELOAD_CHANNEL. Every worker keeps one subscriber; on a version it
+does not have yet it re-reads the file and swaps too. Snapshot builds
+run in a thread so the event loop keeps serving requests.
+"""
+import asyncio
+import os
+
+from services.menu_service import catalog, get_menu_version, MENU_CHECK_INTERVAL
+from services.redis_store import ar
+
+MENU_RELOAD_CHANNEL = os.getenv("MENU_RELOAD_CHANNEL", "menu:reload")
+MENU_WATCH_ENABLED = os.getenv("MENU_WATCH_ENABLED", "1") == "1"
+
+_tasks: list[asyncio.Task] = []
+_announced: str | None = None     # last version this worker settled on
+
+
+async def reload_menu(force: bool = False) -> dict:
+    """
+    Reload this worker's menu and announce it to the others if it changed.
+    """
+    global _announced
+
+    changed = await asyncio.to_thread(catalog.reload, force)
+    version = get_menu_version()
+    if changed or version != _announced:
+        _announced = version
+        await ar.publish(MENU_RELOAD_CHANNEL, version)
+    return {"version": version, "changed": changed}
+
+
+async def _listen():
+    global _announced
+
+    while True:
+        pubsub = ar.pubsub()
+        try:
+            await pubsub.subscribe(MENU_RELOAD_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                if message["data"] != get_menu_version():
+                    await asyncio.to_thread(catalog.reload, True)
+                # whatever this worker now serves has been dealt with; only
+                # later local changes get re-announced
+                _announced = get_menu_version()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ menu reload listener: {e}; reconnecting")
+            await asyncio.sleep(1.0)
+        finally:
+            await pubsub.aclose()
+
+
+async def _watch_file():
+    while True:
+        await asyncio.sleep(MENU_CHECK_INTERVAL)
+        try:
+            await reload_menu()
+        except Exception as e:
+            print(f"⚠️ menu file watch: {e}")
+
+
+def start_menu_reload():
+    global _announced
+
+    if _tasks:
+        return
+    _announced = get_menu_version()
+    _tasks.append(asyncio.create_task(_listen()))
+    if MENU_WATCH_ENABLED:
+        _tasks.append(asyncio.create_task(_watch_file()))
+
+
+async def stop_menu_reload():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
@@ -1,31 +1,168 @@
+"""
+Menu catalog: immutable, indexed snapshots of data/menu.json.
+
+A snapshot carries id / lowercase name+alias / category indexes and the
+content hash of the file (its version). Anything derived from the menu
+(NER matchers, LLM caches, prompt fragments) is keyed on that version.
+Requests only read the current snapshot (the first one is loaded on
+demand). reload() swaps in a new snapshot when the file's content
+changes; listeners registered with catalog.on_change() run in the same
+step. services/menu_reload.py calls it off the event loop, every
+MENU_CHECK_INTERVAL seconds and on announcements from other workers.
+"""
+import hashlib
 import json
+import os
+import threading
 from pathlib import Path
+from types import MappingProxyType
 from typing import List, Dict
 
-MENU_PATH = Path("data/menu.json")
+MENU_PATH = Path(__file__).resolve().parent.parent / "data" / "menu.json"
+MENU_CHECK_INTERVAL = float(os.getenv("MENU_CHECK_INTERVAL", "5.0"))
 
-_menu_cache: List[Dict] = []
 
+def item_names(item: dict) -> list[str]:
+    """
+    Lowercase name and aliases of one menu item.
+    """
+    names = [item["name"].strip().lower()] if item.get("name") else []
+    names += [a.strip().lower() for a in item.get("aliases", [])]
+    return names
 
-def load_menu() -> List[Dict]:
-    global _menu_cache
 
-    if _menu_cache:
-        return _menu_cache
+class MenuSnapshot:
+    def __init__(self, raw: bytes):
+        data = json.loads(raw)
+
+        self.version = hashlib.sha1(raw).hexdigest()[:12]
+        self.items = tuple(data["items"])
+
+        by_id = {}
+        by_name = {}
+        by_category = {}
+        for item in self.items:
+            by_id[item["id"]] = item
+            for name in item_names(item):
+                by_name.setdefault(name, item)
+            by_category.setdefault(item.get("category"), []).append(item)
+
+        self.by_id = MappingProxyType(by_id)
+        # id -> index in the file, for listing items in menu order
+        self.position = MappingProxyType({item["id"]: i for i, item in enumerate(self.items)})
+        # {id: {name, price, position}} for Lua scripts that price orders
+        self.prices_json = json.dumps({
+            item["id"]: {"name": item["name"], "price": item["price"], "position": i}
+            for i, item in enumerate(self.items)
+        })
+        self.by_name = MappingProxyType(by_name)
+        self.by_category = MappingProxyType({k: tuple(v) for k, v in by_category.items()})
+
+        # NER vocabulary and its prompt rendering
+        self.names = tuple(sorted(by_name))
+        self.prompt_names = str(list(self.names))
+
+    def item_by_id(self, item_id: str) -> Dict | None:
+        return self.by_id.get(item_id)
+
+    def item_by_name(self, name: str) -> Dict | None:
+        return self.by_name.get(name.strip().lower())
+
+
+class MenuCatalog:
+    def __init__(self, path: Path):
+        self.path = path
+        self._snapshot: MenuSnapshot | None = None
+        self._stat = None
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.reloads = 0
+
+    def _file_stat(self):
+        st = self.path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def on_change(self, fn):
+        """
+        Register fn(snapshot), called right after a new snapshot is
+        swapped in. Menu-derived caches drop or rebuild themselves here.
+        """
+        self._listeners.append(fn)
+        return fn
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Re-read the file (always when force, else only if its mtime/size
+        moved) and swap in a new snapshot if the content changed.
+        Returns True when the version changed.
+        """
+        with self._lock:
+            stat = self._file_stat()
+            if not force and self._snapshot is not None and stat == self._stat:
+                return False
+            self._stat = stat
+
+            new = MenuSnapshot(self.path.read_bytes())
+            old = self._snapshot
+            if old is not None and new.version == old.version:
+                return False
 
-    with open(MENU_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
+            # a single reference swap: requests holding the old snapshot
+            # finish on it, new requests see the new one
+            self._snapshot = new
+            if old is None:
+                return True
+            self.reloads += 1
 
-    _menu_cache = data["items"]
-    return _menu_cache
+            for fn in self._listeners:
+                fn(new)
+            return True
+
+    def snapshot(self) -> MenuSnapshot:
+        """
+        The current snapshot; never touches the file once one is loaded.
+        """
+        if self._snapshot is None:
+            self.reload()
+        return self._snapshot
+
+    def stats(self) -> dict:
+        snap = self._snapshot
+        return {
+            "version": snap.version if snap else None,
+            "items": len(snap.items) if snap else 0,
+            "reloads": self.reloads,
+        }
+
+
+catalog = MenuCatalog(MENU_PATH)
+
+
+def get_menu_snapshot() -> MenuSnapshot:
+    return catalog.snapshot()
+
+
+def load_menu() -> List[Dict]:
+    return list(get_menu_snapshot().items)
 
 
 def get_menu() -> List[Dict]:
     return load_menu()
 
 
+def get_menu_version() -> str:
+    """
+    Content hash of menu.json; part of every menu-derived cache key.
+    """
+    return get_menu_snapshot().version
+
+
 def get_item_by_id(item_id: str) -> Dict | None:
-    return next(
-        (item for item in load_menu() if item["id"] == item_id),
-        None
-    )
+    return get_menu_snapshot().item_by_id(item_id)
+
+
+def get_item_by_name(name: str) -> Dict | None:
+    """
+    Lookup by lowercase name or alias.
+    """
+    return get_menu_snapshot().item_by_name(name)
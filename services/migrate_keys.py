@@ -0,0 +1,73 @@
+"""
+Move session:<sid> / cart:<sid> keys written by older builds to the
+hash-tagged names in services/keys.py, keeping their TTL.
+
+Run once after deploying the hash-tagged build, and again once the last
+old worker is gone (it is idempotent); run it on the standalone server
+before moving the data to a cluster:
+    python -m services.migrate_keys [--dry-run]
+
+Standalone Redis moves each key with RENAMENX (atomic). A cluster cannot
+rename across slots, so there it falls back to DUMP + RESTORE + DEL.
+Where the new key already exists it wins and the old one is dropped.
+
+Orders keep their old order:<id> keys: clients hold those ids, and
+keys.order_key() maps ids without an embedded session back to them
+until they expire (ORDER_TTL).
+"""
+import sys
+
+from services.keys import cart_key, session_key
+from services.redis_store import REDIS_CLUSTER, rb
+
+LEGACY = {
+    "session:": session_key,
+    "cart:": cart_key,
+}
+
+
+def _legacy_keys():
+    for prefix in LEGACY:
+        for key in rb.scan_iter(match=f"{prefix}*", count=1000):
+            key = key.decode()
+            if "{" not in key:
+                yield prefix, key
+
+
+def _move(old: str, new: str) -> bool:
+    """
+    True if moved, False if the new key already existed.
+    """
+    if not REDIS_CLUSTER:
+        if rb.renamenx(old, new):
+            return True
+        rb.delete(old)
+        return False
+
+    if rb.exists(new):
+        rb.delete(old)
+        return False
+    dump = rb.dump(old)
+    pttl = rb.pttl(old)
+    if dump is None or pttl == -2:
+        # expired in between
+        return False
+    rb.restore(new, max(pttl, 0), dump)
+    rb.delete(old)
+    return True
+
+
+def migrate(dry_run: bool = False) -> dict:
+    counts = {"moved": 0, "superseded": 0}
+    for prefix, old in _legacy_keys():
+        new = LEGACY[prefix](old[len(prefix):])
+        if dry_run:
+            print(f"{old} -> {new}")
+            counts["moved"] += 1
+            continue
+        counts["moved" if _move(old, new) else "superseded"] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    print(migrate(dry_run="--dry-run" in sys.argv[1:]))
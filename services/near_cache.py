@@ -0,0 +1,250 @@
+"""
+In-process near cache for session, cart and order keys.
+
+Repeated reads of the same session (every chat turn, cart view and
+status poll) are served from worker memory; Redis tells every worker when
+one of those keys changes so the entry is dropped right away:
+
+    tracking  CLIENT TRACKING in broadcast mode on the session:, cart:
+              and order: prefixes, redirected to this worker's
+              __redis__:invalidate subscription (Redis >= 6)
+    pubsub    for servers without tracking: the write scripts publish
+              each changed key on NEAR_CACHE_CHANNEL (redis_lua.CHANGED)
+    off       default; every read goes to Redis
+
+Every worker of a deployment must use the same mode. While the
+invalidation connection is down the cache is emptied and bypassed, and
+entries also expire after NEAR_CACHE_TTL seconds (in pubsub mode that
+bounds how long a key expired by Redis can still be served).
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from redis.exceptions import ResponseError
+
+from services.redis_store import REDIS_CLUSTER, new_connection
+
+NEAR_CACHE_MODE = os.getenv("NEAR_CACHE_MODE", "off")
+NEAR_CACHE_SIZE = int(os.getenv("NEAR_CACHE_SIZE", "10000"))
+NEAR_CACHE_TTL = float(os.getenv("NEAR_CACHE_TTL", "60"))
+NEAR_CACHE_CHANNEL = os.getenv("NEAR_CACHE_CHANNEL", "nearcache:invalidate")
+NEAR_CACHE_PING_INTERVAL = float(os.getenv("NEAR_CACHE_PING_INTERVAL", "15"))
+
+NEAR_CACHE_PREFIXES = ("session:", "cart:", "order:")
+TRACKING_CHANNEL = "__redis__:invalidate"
+
+if NEAR_CACHE_MODE not in ("off", "tracking", "pubsub"):
+    raise ValueError(f"Unknown NEAR_CACHE_MODE {NEAR_CACHE_MODE!r}")
+if NEAR_CACHE_MODE == "tracking" and REDIS_CLUSTER:
+    # tracking is per node; pub/sub messages reach every node of a cluster
+    raise ValueError("NEAR_CACHE_MODE=tracking is not supported with REDIS_CLUSTER; use pubsub")
+
+
+class NearCache:
+    """
+    Key -> decoded value, LRU-bounded. Values are shared between
+    requests and must be treated as read-only.
+
+    A read that missed registers its keys with loading(); an invalidation
+    (or reconnect) arriving before the Redis reply is back discards what
+    that read fetched, so a value older than the last invalidation is
+    never stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._live = False
+        self._seq = 0
+        self._reset_seq = 0
+        self._loading: dict[str, int] = {}
+        self._touched: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.discarded = 0
+        self.resets = 0
+
+    def lookup(self, keys: list[str]) -> list | None:
+        """
+        Values for all keys, or None unless every key is cached.
+        """
+        if not self._live:
+            return None
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None or entry[0] < now:
+                    self.misses += 1
+                    return None
+                self._data.move_to_end(key)
+                values.append(entry[1])
+            self.hits += 1
+        return values
+
+    @contextmanager
+    def loading(self, keys: list[str]):
+        """
+        Wraps the Redis read for keys that missed; the caller puts the
+        values to cache into the yielded dict.
+        """
+        if not self._live:
+            yield {}
+            return
+
+        with self._lock:
+            token = self._seq
+            for key in keys:
+                self._loading[key] = self._loading.get(key, 0) + 1
+        fill = {}
+        try:
+            yield fill
+        finally:
+            with self._lock:
+                for key in keys:
+                    self._store(key, fill, token)
+
+    def _store(self, key: str, fill: dict, token: int):
+        if key in fill:
+            if not self._live or token < self._reset_seq or self._touched.get(key, -1) > token:
+                self.discarded += 1
+            else:
+                self._data[key] = (time.monotonic() + self.ttl, fill[key])
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+        self._loading[key] -= 1
+        if not self._loading[key]:
+            del self._loading[key]
+            self._touched.pop(key, None)
+
+    def invalidate(self, keys):
+        if not self._live:
+            return
+        with self._lock:
+            self._seq += 1
+            for key in keys:
+                self._data.pop(key, None)
+                if key in self._loading:
+                    self._touched[key] = self._seq
+            self.invalidations += len(keys)
+
+    def reset(self, live: bool):
+        """
+        Drop everything, e.g. when the invalidation connection (re)starts.
+        """
+        with self._lock:
+            self._data.clear()
+            self._seq += 1
+            self._reset_seq = self._seq
+            self._live = live
+            self.resets += 1
+
+    def stats(self) -> dict:
+        reads = self.hits + self.misses
+        return {
+            "mode": NEAR_CACHE_MODE,
+            "live": self._live,
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / reads, 3) if reads else None,
+            "invalidations": self.invalidations,
+            "discarded": self.discarded,
+            "resets": self.resets,
+        }
+
+
+near_cache = NearCache(NEAR_CACHE_SIZE, NEAR_CACHE_TTL)
+
+_task: asyncio.Task | None = None
+
+
+# -------------------------------
+# Invalidation listener
+# -------------------------------
+async def _subscribe(conn):
+    if NEAR_CACHE_MODE == "pubsub":
+        channel = NEAR_CACHE_CHANNEL
+    else:
+        # broadcast tracking redirected to this same connection: it gets the
+        # invalidations once subscribed, and both go away together
+        await conn.send_command("CLIENT", "ID")
+        client_id = await conn.read_response()
+        prefixes = [arg for p in NEAR_CACHE_PREFIXES for arg in ("PREFIX", p)]
+        await conn.send_command(
+            "CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefixes
+        )
+        await conn.read_response()
+        channel = TRACKING_CHANNEL
+
+    await conn.send_command("SUBSCRIBE", channel)
+    await conn.read_response()
+
+
+async def _listen():
+    while True:
+        conn = None
+        try:
+            conn = await new_connection()
+            await conn.connect()
+            try:
+                await _subscribe(conn)
+            except ResponseError as e:
+                print(f"⚠️ near cache disabled: {e}")
+                return
+            near_cache.reset(live=True)
+
+            ping_sent = False
+            while True:
+                reply = await conn.read_response(timeout=NEAR_CACHE_PING_INTERVAL)
+                if reply is None:
+                    if ping_sent:
+                        raise ConnectionError("no reply to PING")
+                    await conn.send_command("PING")
+                    ping_sent = True
+                    continue
+                ping_sent = False
+
+                if reply[0] != "message":
+                    continue
+                data = reply[2]
+                if data is None:
+                    # FLUSHALL / FLUSHDB
+                    near_cache.reset(live=True)
+                else:
+                    near_cache.invalidate(data if isinstance(data, list) else [data])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ near cache listener: {e}; cache bypassed, reconnecting")
+            await asyncio.sleep(1.0)
+        finally:
+            near_cache.reset(live=False)
+            if conn is not None:
+                await conn.disconnect()
+
+
+def start_near_cache():
+    global _task
+
+    if NEAR_CACHE_MODE != "off" and _task is None:
+        _task = asyncio.create_task(_listen())
+
+
+async def stop_near_cache():
+    global _task
+
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
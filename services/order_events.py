@@ -0,0 +1,109 @@
+"""
+Order status push.
+
+Scripts that write an order publish the stored order document on
+ORDER_EVENTS_CHANNEL (redis_lua.ORDER_CHANGED). Each worker keeps one
+subscription and fans every message out to the SSE streams that watch
+that order, so open status screens cost no Redis reads while nothing
+changes.
+
+A stream only needs the latest state: each watcher holds at most one
+pending update. After the subscription reconnects every watcher gets
+None instead, meaning "re-read the order", since messages sent while it
+was down are lost.
+"""
+import asyncio
+import json
+import os
+from collections import defaultdict
+
+from services.redis_store import ar
+
+ORDER_EVENTS_CHANNEL = os.getenv("ORDER_EVENTS_CHANNEL", "orders:events")
+
+_watchers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+_task: asyncio.Task | None = None
+_stats = {"messages": 0, "delivered": 0, "reconnects": 0}
+
+
+def _offer(queue: asyncio.Queue, value):
+    # keep only the newest update
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(value)
+
+
+def watch_order(order_id: str) -> asyncio.Queue:
+    """
+    Queue of updates for one order: stored order dicts, or None after a
+    reconnect. Pair with unwatch_order().
+    """
+    queue = asyncio.Queue(maxsize=1)
+    _watchers[order_id].add(queue)
+    return queue
+
+
+def unwatch_order(order_id: str, queue: asyncio.Queue):
+    queues = _watchers.get(order_id)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        del _watchers[order_id]
+
+
+def _dispatch(data: str):
+    order = json.loads(data)
+    _stats["messages"] += 1
+    for queue in _watchers.get(order["order_id"], ()):
+        _offer(queue, order)
+        _stats["delivered"] += 1
+
+
+async def _listen():
+    connected_before = False
+    while True:
+        pubsub = ar.pubsub()
+        try:
+            await pubsub.subscribe(ORDER_EVENTS_CHANNEL)
+            if connected_before:
+                _stats["reconnects"] += 1
+                for queues in _watchers.values():
+                    for queue in queues:
+                        _offer(queue, None)
+            connected_before = True
+
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _dispatch(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ order events listener: {e}; reconnecting")
+            await asyncio.sleep(1.0)
+        finally:
+            await pubsub.aclose()
+
+
+def start_order_events():
+    global _task
+
+    if _task is None:
+        _task = asyncio.create_task(_listen())
+
+
+async def stop_order_events():
+    global _task
+
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+
+
+def order_events_stats() -> dict:
+    return {
+        **_stats,
+        "watched_orders": len(_watchers),
+        "streams": sum(len(q) for q in _watchers.values()),
+    }
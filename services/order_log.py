@@ -0,0 +1,333 @@
+"""
+Durable order history in SQLite (WAL), off the request path.
+
+place_order hands each placed order to record(); one writer thread
+collects up to ORDER_LOG_BATCH_SIZE orders or waits
+ORDER_LOG_MAX_WAIT_MS after the first one, then inserts the batch in a
+single transaction. Orders keep the names and prices they were sold at.
+History queries read the SQLite file only, never Redis.
+
+Orders still queued when a worker dies are not lost for good: they stay
+in Redis for ORDER_TTL, and
+    python -m services.order_log --backfill
+copies every order:* key that is missing from the log.
+
+Tables: orders (one row per order, indexed by table and day) and
+order_items (indexed by item and day). "day" is the server's local date
+of created_at.
+"""
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+ORDER_LOG_ENABLED = os.getenv("ORDER_LOG_ENABLED", "1") == "1"
+ORDER_LOG_PATH = os.getenv(
+    "ORDER_LOG_PATH", str(Path(__file__).resolve().parent.parent / "data" / "orders.db")
+)
+ORDER_LOG_BATCH_SIZE = int(os.getenv("ORDER_LOG_BATCH_SIZE", "200"))
+ORDER_LOG_MAX_WAIT_MS = float(os.getenv("ORDER_LOG_MAX_WAIT_MS", "500"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id     TEXT PRIMARY KEY,
+    session_id   TEXT,
+    table_id     TEXT,
+    day          TEXT NOT NULL,
+    created_at   REAL NOT NULL,
+    status       TEXT,
+    menu_version TEXT,
+    total        INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_table_day ON orders (table_id, day, created_at);
+CREATE INDEX IF NOT EXISTS orders_day ON orders (day, created_at);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id TEXT NOT NULL,
+    item_id  TEXT NOT NULL,
+    name     TEXT,
+    price    INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    day      TEXT NOT NULL,
+    PRIMARY KEY (order_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS order_items_item_day ON order_items (item_id, day);
+CREATE INDEX IF NOT EXISTS order_items_day ON order_items (day, item_id);
+"""
+
+_STOP = object()
+
+
+def _day(created_at: float) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(created_at))
+
+
+def _connect(path: str, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    else:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+    # several worker processes may share the file
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _rows(order: dict):
+    day = _day(order["created_at"])
+    order_row = (
+        order["order_id"],
+        order.get("session_id"),
+        order.get("table_id"),
+        day,
+        order["created_at"],
+        order.get("status"),
+        order.get("menu_version"),
+        order["total"],
+    )
+    item_rows = [
+        (order["order_id"], i["item_id"], i.get("name"), i["price"], i["quantity"], day)
+        for i in order["items"]
+    ]
+    return order_row, item_rows
+
+
+def write_orders(conn: sqlite3.Connection, orders: list[dict]) -> int:
+    """
+    Insert priced orders (order_view shape) in one transaction; orders
+    already logged are skipped. Returns the number of new orders.
+    """
+    new = 0
+    with conn:
+        for order in orders:
+            order_row, item_rows = _rows(order)
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)", order_row
+            )
+            if cur.rowcount:
+                new += 1
+                conn.executemany(
+                    "INSERT OR IGNORE INTO order_items VALUES (?, ?, ?, ?, ?, ?)", item_rows
+                )
+    return new
+
+
+class OrderLog:
+    def __init__(self, path: str, max_batch_size: int, max_wait_ms: float):
+        self.path = path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+        self.batches = 0
+        self.orders = 0
+        self.errors = 0
+        self.batch_sizes: Counter = Counter()
+
+    # ---------- writer ----------
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="order-log", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        conn = _connect(self.path)
+        while True:
+            batch = self._collect()
+            stop = batch[-1] is _STOP
+            orders = [o for o in batch if o is not _STOP]
+
+            if orders:
+                try:
+                    write_orders(conn, orders)
+                    self.batches += 1
+                    self.orders += len(orders)
+                    self.batch_sizes[len(orders)] += 1
+                except Exception as e:
+                    self.errors += 1
+                    print(f"⚠️ order log: {len(orders)} orders not written: {e}")
+
+            if stop:
+                conn.close()
+                return
+
+    # ---------- API ----------
+    def record(self, order: dict):
+        """
+        Queue a placed order (order_view shape); never blocks.
+        """
+        if not ORDER_LOG_ENABLED:
+            return
+        self._ensure_started()
+        self._queue.put(order)
+
+    def close(self, timeout: float = 10.0):
+        """
+        Write what is queued and stop the writer thread.
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": ORDER_LOG_ENABLED,
+            "path": self.path,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "orders": self.orders,
+            "errors": self.errors,
+            "avg_batch_size": round(self.orders / self.batches, 2) if self.batches else None,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
+
+
+order_log = OrderLog(ORDER_LOG_PATH, ORDER_LOG_BATCH_SIZE, ORDER_LOG_MAX_WAIT_MS)
+
+
+# -------------------------------
+# Queries (read-only connection, no Redis)
+# -------------------------------
+def _query(sql: str, params: list) -> list[dict]:
+    if not Path(ORDER_LOG_PATH).exists():
+        return []
+    conn = _connect(ORDER_LOG_PATH, readonly=True)
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def order_history(
+    table_id: str | None = None,
+    day: str | None = None,
+    item_id: str | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    """
+    Logged orders, newest first, with their items; filters combine.
+    """
+    where, params = [], []
+    if table_id is not None:
+        where.append("o.table_id = ?")
+        params.append(table_id)
+    if day is not None:
+        where.append("o.day = ?")
+        params.append(day)
+    if item_id is not None:
+        where.append("o.order_id IN (SELECT order_id FROM order_items WHERE item_id = ?)")
+        params.append(item_id)
+
+    sql = "SELECT o.* FROM orders o"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY o.created_at DESC LIMIT ?"
+    orders = _query(sql, params + [limit])
+    if not orders:
+        return []
+
+    ids = [o["order_id"] for o in orders]
+    items = _query(
+        "SELECT order_id, item_id, name, price, quantity FROM order_items"
+        f" WHERE order_id IN ({','.join('?' * len(ids))})",
+        ids,
+    )
+    by_order: dict[str, list] = {}
+    for item in items:
+        by_order.setdefault(item.pop("order_id"), []).append(item)
+    for order in orders:
+        order["items"] = by_order.get(order["order_id"], [])
+    return orders
+
+
+def item_sales(day: str | None = None, item_id: str | None = None) -> list[dict]:
+    """
+    Quantity and revenue per item (and day), best sellers first.
+    """
+    where, params = [], []
+    if day is not None:
+        where.append("day = ?")
+        params.append(day)
+    if item_id is not None:
+        where.append("item_id = ?")
+        params.append(item_id)
+
+    sql = (
+        "SELECT day, item_id, MAX(name) AS name, SUM(quantity) AS quantity,"
+        " SUM(price * quantity) AS revenue, COUNT(*) AS orders FROM order_items"
+    )
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY day, item_id ORDER BY day DESC, quantity DESC"
+    return _query(sql, params)
+
+
+# -------------------------------
+# Backfill from Redis
+# -------------------------------
+def backfill() -> int:
+    """
+    Log every order still in Redis that the log is missing.
+    """
+    from services.redis_store import rb, get_json
+    from services.session_service import ORDER_TTL, order_view
+
+    conn = _connect(ORDER_LOG_PATH)
+    new = 0
+    try:
+        keys = [k.decode() for k in rb.scan_iter(match="order:*", count=1000)]
+        for start in range(0, len(keys), ORDER_LOG_BATCH_SIZE):
+            orders = []
+            for key in keys[start:start + ORDER_LOG_BATCH_SIZE]:
+                # one GET each: on a cluster the keys sit in different slots
+                order = get_json(key)
+                if not order:
+                    continue
+                if "created_at" not in order:
+                    # early orders have no timestamp; derive it from the TTL left
+                    ttl = rb.ttl(key)
+                    order["created_at"] = time.time() - (ORDER_TTL - ttl if ttl > 0 else 0)
+                orders.append(order_view(order))
+            new += write_orders(conn, orders)
+    finally:
+        conn.close()
+    return new
+
+
+if __name__ == "__main__":
+    if "--backfill" in sys.argv[1:]:
+        print({"backfilled": backfill()})
@@ -0,0 +1,71 @@
+"""
+Lua helpers shared by the cart and session scripts, prepended to a
+script body.
+
+LOAD_CART / LOAD_SESSION convert a key written by older builds as a JSON
+string into the hash layout in place, keeping its TTL. CHANGED announces
+a written key to the near caches of other workers when they rely on
+pub/sub invalidation (services/near_cache.py). ORDER_CHANGED (after
+CHANGED) also pushes a written order to the status streams
+(services/order_events.py).
+"""
+import json
+
+from services.near_cache import NEAR_CACHE_MODE, NEAR_CACHE_CHANNEL
+from services.order_events import ORDER_EVENTS_CHANNEL
+
+# cart:<sid>: JSON list of {item_id, quantity, ...} -> {item_id: quantity}
+LOAD_CART = """
+local function load_cart(key)
+  if redis.call('TYPE', key).ok ~= 'string' then
+    return
+  end
+  local pttl = redis.call('PTTL', key)
+  local old = cjson.decode(redis.call('GET', key))
+  redis.call('DEL', key)
+  for _, it in ipairs(old) do
+    redis.call('HSET', key, it.item_id, it.quantity)
+  end
+  if pttl > 0 and redis.call('EXISTS', key) == 1 then
+    redis.call('PEXPIRE', key, pttl)
+  end
+end
+"""
+
+# session:<sid>: JSON {table_id, status} -> hash with the same fields
+LOAD_SESSION = """
+local function load_session(key)
+  if redis.call('TYPE', key).ok ~= 'string' then
+    return
+  end
+  local pttl = redis.call('PTTL', key)
+  local old = cjson.decode(redis.call('GET', key))
+  redis.call('DEL', key)
+  for field, value in pairs(old) do
+    redis.call('HSET', key, field, tostring(value))
+  end
+  if pttl > 0 then
+    redis.call('PEXPIRE', key, pttl)
+  end
+end
+"""
+
+if NEAR_CACHE_MODE == "pubsub":
+    CHANGED = f"""
+local function changed(key)
+  redis.call('PUBLISH', {json.dumps(NEAR_CACHE_CHANNEL)}, key)
+end
+"""
+else:
+    # tracking mode gets invalidations from Redis itself
+    CHANGED = """
+local function changed(key)
+end
+"""
+
+ORDER_CHANGED = f"""
+local function order_changed(key, order)
+  changed(key)
+  redis.call('PUBLISH', {json.dumps(ORDER_EVENTS_CHANNEL)}, order)
+end
+"""
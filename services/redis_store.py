@@ -1,27 +1,232 @@
-import redis
+"""
+Redis access layer.
+
+Every helper is one round trip (writes use SET ... EX); reads and writes
+that span several keys are Lua scripts in the service modules. Every
+client uses an explicitly sized blocking pool (callers wait for a free
+connection instead of opening unbounded ones), and every command or
+pipeline sent inside a request is counted so app.py can report
+round trips per endpoint.
+
+r / ar return str (hashes, scripts, counters). rb / arb return bytes;
+the JSON helpers below read orders (cjson, written by Lua) through them.
+The LLM response cache and idempotency entries use rb / arb with
+services/codec.py.
+
+REDIS_CLUSTER=1 builds the same clients as RedisCluster (REDIS_URL is
+any node; REDIS_POOL_SIZE applies per node). Multi-key commands,
+scripts and MULTI pipelines then need keys with a common hash tag
+(services/keys.py).
+"""
+import contextvars
 import json
 import os
+from collections import defaultdict
+
+import redis
+import redis.asyncio as aioredis
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_CLUSTER = os.getenv("REDIS_CLUSTER", "0") == "1"
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "64"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+
+# -------------------------------
+# Round-trip accounting
+# -------------------------------
+_round_trips: contextvars.ContextVar[list | None] = contextvars.ContextVar(
+    "redis_round_trips", default=None
+)
+
+
+def start_round_trip_count() -> list:
+    """
+    Start counting for the current request; returns the mutable counter
+    ([n]) so the caller can read it after the handler ran.
+    """
+    counter = [0]
+    _round_trips.set(counter)
+    return counter
+
+
+def _count_round_trip():
+    counter = _round_trips.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+_route_stats: dict = defaultdict(lambda: {"requests": 0, "round_trips": 0, "max": 0})
+
+
+def record_round_trips(route: str, n: int):
+    stats = _route_stats[route]
+    stats["requests"] += 1
+    stats["round_trips"] += n
+    stats["max"] = max(stats["max"], n)
+
+
+def round_trip_stats() -> dict:
+    return {
+        route: {
+            "requests": s["requests"],
+            "avg": round(s["round_trips"] / s["requests"], 2),
+            "max": s["max"],
+        }
+        for route, s in sorted(_route_stats.items())
+    }
+
+
+class CountingPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        _count_round_trip()
+        return super().execute(raise_on_error)
+
+
+class CountingRedis(redis.Redis):
+    def execute_command(self, *args, **options):
+        _count_round_trip()
+        return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        return CountingPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class AsyncCountingPipeline(aioredis.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        _count_round_trip()
+        return await super().execute(raise_on_error)
+
+
+class AsyncCountingRedis(aioredis.Redis):
+    async def execute_command(self, *args, **options):
+        _count_round_trip()
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        return AsyncCountingPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+# ClusterPipeline is built from the client's internals; keep the stock
+# factory and only swap in a counting execute()
+class CountingClusterPipeline(redis.cluster.ClusterPipeline):
+    def execute(self, raise_on_error: bool = True):
+        _count_round_trip()
+        return super().execute(raise_on_error)
 
-r = redis.Redis.from_url(
-    REDIS_URL,
-    decode_responses=True
+
+class CountingRedisCluster(redis.cluster.RedisCluster):
+    def execute_command(self, *args, **kwargs):
+        _count_round_trip()
+        return super().execute_command(*args, **kwargs)
+
+    def pipeline(self, transaction=None, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        pipe.__class__ = CountingClusterPipeline
+        return pipe
+
+
+class AsyncCountingClusterPipeline(aioredis.cluster.ClusterPipeline):
+    async def execute(self, raise_on_error: bool = True, allow_redirections: bool = True):
+        _count_round_trip()
+        return await super().execute(raise_on_error, allow_redirections)
+
+
+class AsyncCountingRedisCluster(aioredis.cluster.RedisCluster):
+    async def execute_command(self, *args, **kwargs):
+        _count_round_trip()
+        return await super().execute_command(*args, **kwargs)
+
+    def pipeline(self, transaction=None, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        pipe.__class__ = AsyncCountingClusterPipeline
+        return pipe
+
+
+# -------------------------------
+# Clients
+# -------------------------------
+_pool_kwargs = dict(
+    max_connections=REDIS_POOL_SIZE,
+    timeout=REDIS_POOL_TIMEOUT,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+)
+
+_cluster_kwargs = dict(
+    max_connections=REDIS_POOL_SIZE,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
 )
 
+
+def _sync_client(decode: bool):
+    if REDIS_CLUSTER:
+        return CountingRedisCluster.from_url(
+            REDIS_URL, decode_responses=decode, **_cluster_kwargs
+        )
+    pool = redis.BlockingConnectionPool.from_url(
+        REDIS_URL, decode_responses=decode, **_pool_kwargs
+    )
+    return CountingRedis(connection_pool=pool)
+
+
+def _async_client(decode: bool):
+    if REDIS_CLUSTER:
+        return AsyncCountingRedisCluster.from_url(
+            REDIS_URL, decode_responses=decode, **_cluster_kwargs
+        )
+    pool = aioredis.BlockingConnectionPool.from_url(
+        REDIS_URL, decode_responses=decode, **_pool_kwargs
+    )
+    return AsyncCountingRedis(connection_pool=pool)
+
+
+r = _sync_client(decode=True)
+rb = _sync_client(decode=False)
+
+# Event-loop clients for async handlers
+ar = _async_client(decode=True)
+arb = _async_client(decode=False)
+
+
+async def new_connection():
+    """
+    A connection outside the pool for long-lived listeners (decoded
+    replies); on a cluster, to a random node. The caller disconnects it.
+    """
+    if REDIS_CLUSTER:
+        await ar.initialize()
+        node = ar.get_random_node()
+        return node.connection_class(**node.connection_kwargs)
+    return ar.connection_pool.make_connection()
+
+
+def _dumps(value) -> str:
+    return json.dumps(value)
+
+
+def _loads(data):
+    return json.loads(data) if data else None
+
+
 # ---------- Generic helpers ----------
 
-def set_json(key: str, value: dict, ttl: int | None = None):
-    data = json.dumps(value)
-    r.set(key, data)
-    if ttl:
-        r.expire(key, ttl)
+def set_json(key: str, value, ttl: int | None = None):
+    rb.set(key, _dumps(value), ex=ttl)
 
 
 def get_json(key: str):
-    data = r.get(key)
-    return json.loads(data) if data else None
+    return _loads(rb.get(key))
 
 
 def delete(key: str):
     r.delete(key)
+
+
+# ---------- Async helpers ----------
+
+async def get_json_async(key: str):
+    return _loads(await arb.get(key))
@@ -1,5 +1,297 @@
-from services.redis_store import get_session
+"""
+Session state machine: ORDERING -> CONFIRMED -> PLACED, then the
+order's kitchen states PLACED -> PREPARING -> READY.
 
-def ensure_ordering(session_id):
-    session = get_session(session_id)
-    return session and session.get("state") == "ORDERING"
+session:{<session_id>} is a hash {table_id, status[, order_id]}. Each
+transition is one Lua script that checks the current state and applies
+every write (session, cart snapshot, order, TTLs) atomically, so a
+double-tap on "Place order" cannot create two orders. A wrong state
+comes back as CONFLICT with the current status instead of a write.
+
+Orders are priced when they are placed: the script gets the current
+menu's {item_id: {name, price}} and stores every line's name and price,
+the total and the menu version, so a later menu reload never changes an
+order. Order reads go through the worker's near cache when it is
+enabled. Placed
+orders are also queued for the durable history (services/order_log.py).
+"""
+import json
+import time
+import uuid
+
+from services.cart_service import hash_to_dict, cart_items, cart_total
+from services.keys import session_key, cart_key, order_key, new_order_id
+from services.kitchen import KITCHEN_STREAM, KITCHEN_STREAM_MAXLEN
+from services.menu_service import get_menu_snapshot
+from services.near_cache import near_cache
+from services.order_log import order_log
+from services.redis_lua import LOAD_CART, LOAD_SESSION, CHANGED, ORDER_CHANGED
+from services.redis_store import REDIS_CLUSTER, ar, get_json_async
+
+SESSION_TTL = 3600
+ORDER_TTL = 86400
+
+# KEYS: session, cart   ARGV: ttl
+# returns {result, flat session, flat cart}; result OK | NO_SESSION | EMPTY_CART | CONFLICT
+_CONFIRM = LOAD_CART + LOAD_SESSION + CHANGED + """
+load_session(KEYS[1])
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then
+  return {'NO_SESSION', {}, {}}
+end
+load_cart(KEYS[2])
+if status ~= 'ORDERING' and status ~= 'CONFIRMED' then
+  return {'CONFLICT', redis.call('HGETALL', KEYS[1]), {}}
+end
+if redis.call('HLEN', KEYS[2]) == 0 then
+  return {'EMPTY_CART', redis.call('HGETALL', KEYS[1]), {}}
+end
+
+redis.call('HSET', KEYS[1], 'status', 'CONFIRMED')
+changed(KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return {'OK', redis.call('HGETALL', KEYS[1]), redis.call('HGETALL', KEYS[2])}
+"""
+
+# KEYS: session, cart, order[, kitchen stream]
+# ARGV: order_id, session_id, session_ttl, order_ttl, menu_version, created_at, stream maxlen,
+#       prices json {item_id: {name, price, position}}
+# returns {result, flat session, order json | false}
+_PLACE = LOAD_CART + LOAD_SESSION + CHANGED + ORDER_CHANGED + """
+load_session(KEYS[1])
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then
+  return {'NO_SESSION', {}, false}
+end
+if status ~= 'CONFIRMED' then
+  return {'CONFLICT', redis.call('HGETALL', KEYS[1]), false}
+end
+load_cart(KEYS[2])
+
+local prices = cjson.decode(ARGV[8])
+local flat = redis.call('HGETALL', KEYS[2])
+local items, positions, total = {}, {}, 0
+for i = 1, #flat, 2 do
+  local menu_item = prices[flat[i]]
+  -- items no longer on the menu are not shown in the cart either
+  if menu_item then
+    local quantity = tonumber(flat[i + 1])
+    items[#items + 1] = {
+      item_id = flat[i], name = menu_item.name, price = menu_item.price, quantity = quantity,
+    }
+    positions[flat[i]] = menu_item.position
+    total = total + menu_item.price * quantity
+  end
+end
+if #items == 0 then
+  return {'EMPTY_CART', redis.call('HGETALL', KEYS[1]), false}
+end
+table.sort(items, function(a, b) return positions[a.item_id] < positions[b.item_id] end)
+
+local order = cjson.encode({
+  order_id = ARGV[1],
+  session_id = ARGV[2],
+  table_id = redis.call('HGET', KEYS[1], 'table_id'),
+  items = items,
+  total = total,
+  status = 'PLACED',
+  menu_version = ARGV[5],
+  created_at = tonumber(ARGV[6]),
+})
+redis.call('SET', KEYS[3], order, 'EX', ARGV[4])
+order_changed(KEYS[3], order)
+if KEYS[4] then
+  redis.call('XADD', KEYS[4], 'MAXLEN', '~', ARGV[7], '*', 'order_id', ARGV[1], 'order', order)
+end
+redis.call('HSET', KEYS[1], 'status', 'PLACED', 'order_id', ARGV[1])
+changed(KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return {'OK', redis.call('HGETALL', KEYS[1]), order}
+"""
+
+# next kitchen state -> the state it must come from
+ORDER_TRANSITIONS = {"PREPARING": "PLACED", "READY": "PREPARING"}
+
+# KEYS: order   ARGV: new status, required current status, now
+# returns {result, order json | false}; result OK | NO_ORDER | CONFLICT
+_ORDER_STATUS = CHANGED + ORDER_CHANGED + """
+local raw = redis.call('GET', KEYS[1])
+if not raw then
+  return {'NO_ORDER', false}
+end
+local order = cjson.decode(raw)
+if order.status == ARGV[1] then
+  return {'OK', raw}
+end
+if order.status ~= ARGV[2] then
+  return {'CONFLICT', raw}
+end
+
+order.status = ARGV[1]
+order[string.lower(ARGV[1]) .. '_at'] = tonumber(ARGV[3])
+raw = cjson.encode(order)
+redis.call('SET', KEYS[1], raw, 'KEEPTTL')
+order_changed(KEYS[1], raw)
+return {'OK', raw}
+"""
+
+_confirm_script_async = ar.register_script(_CONFIRM)
+_place_script_async = ar.register_script(_PLACE)
+_order_status_script_async = ar.register_script(_ORDER_STATUS)
+
+
+def new_session_id() -> str:
+    return str(uuid.uuid4())
+
+
+def order_view(order: dict) -> dict:
+    """
+    Stored order -> API shape: the names, prices and total it was placed
+    with. Orders placed before those were stored (at most ORDER_TTL old)
+    get them from the current menu; no line is ever left out.
+    """
+    if "total" in order:
+        return order
+
+    items = order.get("items", [])
+    if items and "price" not in items[0]:
+        menu = get_menu_snapshot()
+        priced = []
+        for line in items:
+            menu_item = menu.item_by_id(line["item_id"]) or {}
+            priced.append({
+                "item_id": line["item_id"],
+                "name": menu_item.get("name", line["item_id"]),
+                "price": menu_item.get("price", 0),
+                "quantity": line["quantity"],
+            })
+        items = priced
+    return {**order, "items": items, "total": cart_total(items)}
+
+
+def _confirm_args(session_id: str):
+    return dict(keys=[session_key(session_id), cart_key(session_id)], args=[SESSION_TTL])
+
+
+def _place_args(session_id: str, order_id: str):
+    keys = [session_key(session_id), cart_key(session_id), order_key(order_id)]
+    if not REDIS_CLUSTER:
+        # on a cluster the stream sits in another slot; see _kitchen_entry
+        keys.append(KITCHEN_STREAM)
+    menu = get_menu_snapshot()
+    return dict(
+        keys=keys,
+        args=[
+            order_id, session_id, SESSION_TTL, ORDER_TTL, menu.version, time.time(),
+            KITCHEN_STREAM_MAXLEN, menu.prices_json,
+        ],
+    )
+
+
+def _kitchen_entry(reply) -> dict | None:
+    """
+    Stream entry to add after a placed order when the script could not
+    (cluster mode only).
+    """
+    result, _, order = reply
+    if not REDIS_CLUSTER or result != "OK":
+        return None
+    return {"order_id": json.loads(order)["order_id"], "order": order}
+
+
+def _parse_confirm(reply):
+    result, session, cart = reply
+    return result, hash_to_dict(session), cart_items(cart)
+
+
+def _parse_place(reply):
+    result, session, order = reply
+    if not order:
+        return result, hash_to_dict(session), None
+
+    order = order_view(json.loads(order))
+    order_log.record(order)
+    return result, hash_to_dict(session), order
+
+
+# ---------- start ----------
+
+def _session_fields(table_id: str) -> dict:
+    return {"table_id": table_id, "status": "ORDERING"}
+
+
+async def start_session_async(table_id: str) -> str:
+    session_id = new_session_id()
+    async with ar.pipeline(transaction=True) as pipe:
+        pipe.hset(session_key(session_id), mapping=_session_fields(table_id))
+        pipe.expire(session_key(session_id), SESSION_TTL)
+        await pipe.execute()
+    return session_id
+
+
+# ---------- transitions ----------
+
+async def confirm_cart_async(session_id: str):
+    """
+    ORDERING -> CONFIRMED (re-confirming is a no-op).
+    Returns (result, session, cart items).
+    """
+    reply = await _confirm_script_async(**_confirm_args(session_id))
+    near_cache.invalidate([session_key(session_id)])
+    return _parse_confirm(reply)
+
+
+async def place_order_async(session_id: str):
+    """
+    CONFIRMED -> PLACED, writing the order from the cart in the same
+    step. Returns (result, session, order); on CONFLICT the session
+    shows the current status (and order_id once placed).
+    """
+    reply = await _place_script_async(**_place_args(session_id, new_order_id(session_id)))
+    near_cache.invalidate([session_key(session_id)])
+    entry = _kitchen_entry(reply)
+    if entry:
+        await ar.xadd(KITCHEN_STREAM, entry, maxlen=KITCHEN_STREAM_MAXLEN, approximate=True)
+    return _parse_place(reply)
+
+
+# ---------- orders ----------
+
+async def get_order_async(order_id: str) -> dict | None:
+    """
+    Stored order (read-only) or None.
+    """
+    key = order_key(order_id)
+    cached = near_cache.lookup([key])
+    if cached is not None:
+        return cached[0]
+
+    with near_cache.loading([key]) as fill:
+        order = await get_json_async(key)
+        if order:
+            fill[key] = order
+    return order
+
+
+# ---------- kitchen states ----------
+
+def _order_status_args(order_id: str, status: str):
+    return dict(keys=[order_key(order_id)], args=[status, ORDER_TRANSITIONS[status], time.time()])
+
+
+def _parse_order_status(reply):
+    result, order = reply
+    return result, (json.loads(order) if order else None)
+
+
+async def set_order_status_async(order_id: str, status: str):
+    """
+    PLACED -> PREPARING -> READY (repeating a step is a no-op); the
+    order document is updated and pushed to its status streams.
+    Returns (result, stored order); result OK, NO_ORDER or CONFLICT.
+    """
+    reply = await _order_status_script_async(**_order_status_args(order_id, status))
+    near_cache.invalidate([order_key(order_id)])
+    return _parse_order_status(reply)